@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from typing import Any, List
+
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ["SNAPSHOT_PATH"] = ""
+# Измеряются обработчики, а не лимиты Telegram: ограничения отправки снимаются
+os.environ["SEND_RATE"] = os.environ["BROADCAST_RATE"] = os.environ["SEND_CHAT_RATE"] = "1000000"
+os.environ["SEND_CHAT_BURST"] = "1000000"
+
+from bot.api.timetable import TimetableAPI
+from bot.cluster import shard_for
+from bot.config import Config
+from bot.handlers import Handlers
+from bot.storage.memory import MemorySessionStore
+from benchmarks.fake_telegram import FakeBot, make_update
+from benchmarks.fake_upstream import FakeUpstream
+
+
+async def serve_shard(shard: int, workers: int, args: argparse.Namespace, base_url: str, barrier: Any) -> float:
+    users = [user_id for user_id in range(1, args.users + 1) if shard_for(user_id, workers) == shard]
+    store = MemorySessionStore()
+    for user_id in users:
+        await store.update(str(user_id), storage_value=f"D{user_id % args.groups}")
+    
+    handlers = Handlers(Config(), sessions=store, api=TimetableAPI(urls={'T': base_url, 'D': base_url}))
+    handlers.sender.start()
+    for storage_value in await store.distinct_storage_values():
+        await handlers.timetable_cache.get_entry(storage_value)
+    
+    bot = FakeBot()
+    updates = [make_update(bot, idx, users[idx % len(users)], "📖 Неделя") for idx in range(args.requests // workers)]
+    barrier.wait()
+    started = time.perf_counter()
+    for update in updates:
+        await handlers.week_handler(update, None)
+    elapsed = time.perf_counter() - started
+    await handlers.close()
+    return elapsed
+
+
+def run_shard(shard: int, workers: int, args: argparse.Namespace, base_url: str, barrier: Any, results: Any) -> None:
+    results.put(asyncio.run(serve_shard(shard, workers, args, base_url, barrier)))
+
+
+def measure(workers: int, args: argparse.Namespace, base_url: str) -> float:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_shard, args=(shard, workers, args, base_url, barrier, results))
+        for shard in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    elapsed: List[float] = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return (args.requests // workers) * workers / max(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность обработчиков при разбиении пользователей по процессам")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--groups", type=int, default=200)
+    args = parser.parse_args()
+    
+    upstream = FakeUpstream()
+    base_url = upstream.start()
+    try:
+        baseline = None
+        for workers in args.workers:
+            rps = measure(workers, args, base_url)
+            baseline = baseline or rps / workers
+            print(f"workers={workers:<3} rps={rps:<10.1f} масштабирование={rps / baseline:.2f}x")
+    finally:
+        upstream.stop()
+
+
+if __name__ == '__main__':
+    main()
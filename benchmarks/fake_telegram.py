@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+from telegram import CallbackQuery, Chat, Message, Update, User
+
+
+class FakeBot:
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.sent: List[Dict[str, Any]] = []
+        self._message_id = 0
+    
+    def _message(self, chat_id: int, text: str) -> Message:
+        self._message_id += 1
+        message = Message(self._message_id, datetime.now(), Chat(chat_id, Chat.PRIVATE), text=text)
+        message.set_bot(self)
+        return message
+    
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> Message:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append({"chat_id": chat_id, "text": text, "parse_mode": kwargs.get("parse_mode")})
+        return self._message(chat_id, text)
+    
+    async def edit_message_text(self, text: str, chat_id: int, message_id: int, **kwargs: Any) -> Message:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append({"chat_id": chat_id, "text": text, "parse_mode": kwargs.get("parse_mode"), "edited": message_id})
+        return self._message(chat_id, text)
+    
+    async def answer_callback_query(self, callback_query_id: str, **kwargs: Any) -> bool:
+        return True
+
+
+def make_update(bot: FakeBot, update_id: int, user_id: int, text: str) -> Update:
+    user = User(user_id, f"user{user_id}", False)
+    message = Message(update_id, datetime.now(), Chat(user_id, Chat.PRIVATE), from_user=user, text=text)
+    message.set_bot(bot)
+    return Update(update_id, message=message)
+
+
+def make_callback_update(bot: FakeBot, update_id: int, user_id: int, data: str, message_id: int = 1) -> Update:
+    user = User(user_id, f"user{user_id}", False)
+    message = Message(message_id, datetime.now(), Chat(user_id, Chat.PRIVATE), text="")
+    query = CallbackQuery(str(update_id), user, f"chat{user_id}", message=message, data=data)
+    query.set_bot(bot)
+    message.set_bot(bot)
+    return Update(update_id, callback_query=query)
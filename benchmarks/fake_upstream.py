@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+WEEKDAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+PAIRS = [("08:30", "10:05"), ("10:15", "11:50"), ("12:00", "13:35"), ("14:15", "15:50"), ("16:00", "17:35"), ("17:45", "19:20")]
+DISCIPLINES = ["лек Математический анализ", "пр Физика", "лаб Программирование", "лек История", "пр Иностранный язык", "лаб Базы данных"]
+
+
+def build_rasp(entity_id: str, sdate: str, lessons_per_day: int = 6, subgroups: int = 2) -> List[Dict[str, Any]]:
+    day = datetime.strptime(sdate, '%Y-%m-%d')
+    monday = day - timedelta(days=day.weekday())
+    seed = sum(ord(c) for c in entity_id)
+    items = []
+    for day_idx, weekday in enumerate(WEEKDAYS):
+        date = monday + timedelta(days=day_idx)
+        for pair_idx in range(lessons_per_day):
+            start, end = PAIRS[pair_idx % len(PAIRS)]
+            for subgroup in range(subgroups):
+                discipline = DISCIPLINES[(seed + day_idx + pair_idx + subgroup) % len(DISCIPLINES)]
+                items.append({
+                    "дата": date.strftime('%Y-%m-%dT00:00:00'),
+                    "деньНедели": day_idx + 1,
+                    "день_недели": f"{weekday} {date.day}",
+                    "начало": start,
+                    "конец": end,
+                    "дисциплина": discipline,
+                    "преподаватель": f"Преподаватель {(seed + pair_idx) % 40} И.О.",
+                    "группа": f"ВИС{entity_id}-{subgroup + 1}",
+                    "аудитория": f"{1 + (seed + pair_idx) % 9}-{100 + day_idx * 10 + pair_idx}",
+                })
+    return items
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeUpstream:
+    def __init__(self, delay: float = 0.0, lessons_per_day: int = 6, subgroups: int = 2, host: str = '127.0.0.1', port: int = 0):
+        self.delay = delay
+        self.lessons_per_day = lessons_per_day
+        self.subgroups = subgroups
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+    
+    def start(self) -> str:
+        self._thread.start()
+        return self.base_url
+    
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def _count(self) -> None:
+        with self._lock:
+            self.requests += 1
+    
+    def _respond(self, path: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        if path == "/api/tokenauth":
+            return {"state": 1, "data": {"accessToken": "token", "data": {"id": 1}}}
+        if path == "/api/UserInfo/Student":
+            return {"state": 1, "data": {"group": {"item2": 100}}}
+        if path == "/api/UserInfo/user":
+            return {"state": 1, "data": {"teacherID": 200}}
+        if path == "/api/Rasp":
+            entity_id = (query.get("idGroup") or query.get("idTeacher") or ["0"])[0]
+            sdate = query.get("sdate", [datetime.now().strftime('%Y-%m-%d')])[0]
+            return {"state": 1, "data": {"rasp": build_rasp(entity_id, sdate, self.lessons_per_day, self.subgroups)}}
+        return {}
+    
+    def _make_handler(self):
+        upstream = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def _handle(self):
+                upstream._count()
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                if upstream.delay:
+                    time.sleep(upstream.delay)
+                parsed = urlparse(self.path)
+                payload = upstream._respond(parsed.path, parse_qs(parsed.query))
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(200 if payload else 404)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            do_GET = _handle
+            do_POST = _handle
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
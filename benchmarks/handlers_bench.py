@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ["SNAPSHOT_PATH"] = ""
+# Измеряются обработчики, а не лимиты Telegram: ограничения отправки снимаются
+os.environ["SEND_RATE"] = os.environ["BROADCAST_RATE"] = os.environ["SEND_CHAT_RATE"] = "1000000"
+os.environ["SEND_CHAT_BURST"] = "1000000"
+
+from bot.api.timetable import TimetableAPI
+from bot.config import Config
+from bot.constants import get_current_date, get_tomorrow_date, shift_date
+from bot.handlers import Handlers
+from bot.render import RenderCache
+from bot.storage.memory import MemorySessionStore
+from bot.storage.session import Session, SessionStore
+from benchmarks.fake_telegram import FakeBot, make_update
+from benchmarks.fake_upstream import FakeUpstream
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+    
+    def reset(self) -> None:
+        self.samples.clear()
+    
+    async def measure(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.samples[stage].append(time.perf_counter() - started)
+
+
+class TimedSessionStore(SessionStore):
+    def __init__(self, backend: SessionStore, recorder: Recorder):
+        self.backend = backend
+        self.recorder = recorder
+    
+    async def get(self, user_id: str) -> Session:
+        return await self.recorder.measure("session_get", self.backend.get(user_id))
+    
+    async def update(self, user_id: str, **changes: Optional[str]) -> None:
+        await self.recorder.measure("session_update", self.backend.update(user_id, **changes))
+    
+    async def delete(self, user_id: str) -> None:
+        await self.recorder.measure("session_delete", self.backend.delete(user_id))
+    
+    async def distinct_storage_values(self) -> List[str]:
+        return await self.backend.distinct_storage_values()
+    
+    async def find_users_by_storage_value(self, storage_value: str) -> List[str]:
+        return await self.backend.find_users_by_storage_value(storage_value)
+    
+    async def find_digest_subscribers(self, digest_time: str) -> Dict[str, List[str]]:
+        return await self.backend.find_digest_subscribers(digest_time)
+
+
+class TimedTimetableAPI(TimetableAPI):
+    def __init__(self, recorder: Recorder, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+    
+    async def auth_user(self, *args: Any) -> Dict[str, Any]:
+        return await self.recorder.measure("upstream_auth", super().auth_user(*args))
+    
+    async def get_student_group_id(self, *args: Any) -> int:
+        return await self.recorder.measure("upstream_user_info", super().get_student_group_id(*args))
+    
+    async def get_teacher_id(self, *args: Any) -> int:
+        return await self.recorder.measure("upstream_user_info", super().get_teacher_id(*args))
+    
+    async def get_timetable(self, storage_value: str, sdate: Optional[str] = None) -> Dict[str, Any]:
+        return await self.recorder.measure("upstream_rasp", super().get_timetable(storage_value, sdate))
+
+
+class TimedRenderCache(RenderCache):
+    def __init__(self, recorder: Recorder, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+    
+    def render(self, *args: Any):
+        started = time.perf_counter()
+        try:
+            return super().render(*args)
+        finally:
+            self.recorder.samples["render"].append(time.perf_counter() - started)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+
+class Benchmark:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.recorder = Recorder()
+        self.bot = FakeBot(latency=args.telegram_latency)
+        self.upstream = FakeUpstream(delay=args.upstream_delay, lessons_per_day=args.lessons_per_day, subgroups=args.subgroups)
+        self.store = MemorySessionStore(latency=args.mongo_latency)
+        self.users = list(range(1, args.users + 1))
+        self._update_id = 0
+    
+    def _handlers(self, cache_ttl: int) -> Handlers:
+        config = Config()
+        config.timetable_cache_ttl = cache_ttl
+        config.timetable_stale_grace = 0
+        config.send_workers = self.args.concurrency
+        base_url = self.upstream.base_url
+        api = TimedTimetableAPI(self.recorder, urls={'T': base_url, 'D': base_url}, max_connections=self.args.concurrency)
+        handlers = Handlers(config, sessions=TimedSessionStore(self.store, self.recorder), api=api)
+        handlers.render_cache = TimedRenderCache(self.recorder, max_size=config.timetable_cache_size)
+        handlers.sender.start()
+        return handlers
+    
+    async def _populate(self) -> None:
+        for user_id in self.users:
+            group = user_id % self.args.groups
+            storage_value = f"D{group}T" if group % 10 == 0 else f"D{group}"
+            await self.store.update(str(user_id), storage_value=storage_value)
+    
+    def _update(self, user_id: int, text: str):
+        self._update_id += 1
+        return make_update(self.bot, self._update_id, user_id, text)
+    
+    async def _drive(self, requests: int, call: Callable[[int], Awaitable[None]]) -> Dict[str, Any]:
+        latencies: List[float] = []
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(random.choice(self.users))
+        
+        async def worker():
+            while not queue.empty():
+                user_id = queue.get_nowait()
+                started = time.perf_counter()
+                await call(user_id)
+                latencies.append(time.perf_counter() - started)
+        
+        upstream_before = self.upstream.requests
+        self.recorder.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        
+        return {
+            "requests": requests,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": summarize(latencies),
+            "stages_ms": {stage: summarize(values) for stage, values in sorted(self.recorder.samples.items())},
+            "upstream_requests": self.upstream.requests - upstream_before,
+        }
+    
+    async def _timetable_scenario(self, handlers: Handlers, button: str, handler: Callable) -> Dict[str, Any]:
+        async def call(user_id: int):
+            await handler(self._update(user_id, button), None)
+        return await self._drive(self.args.requests, call)
+    
+    async def _login_scenario(self, handlers: Handlers) -> Dict[str, Any]:
+        async def call(user_id: int):
+            user_id += 10 ** 9
+            await handlers.login_handler(self._update(user_id, "🔑 Авторизация"), None)
+            await handlers.text_message_handler(self._update(user_id, f"student{user_id}@donstu.ru"), None)
+            await handlers.text_message_handler(self._update(user_id, "password"), None)
+            # Проверка пароля идёт в фоновой очереди, ждём её результата
+            await handlers.login_queue.join()
+        handlers.login_queue.start()
+        return await self._drive(max(1, self.args.requests // 10), call)
+    
+    async def run(self) -> Dict[str, Any]:
+        self.upstream.start()
+        await self._populate()
+        scenarios: Dict[str, Any] = {}
+        try:
+            for mode, ttl in (("cold", 0), ("warm", 3600)):
+                handlers = self._handlers(ttl)
+                buttons = [
+                    ("today", "📖 Сегодня", handlers.today_handler),
+                    ("tomorrow", "📖 Завтра", handlers.tomorrow_handler),
+                    ("week", "📖 Неделя", handlers.week_handler),
+                ]
+                if mode == "warm":
+                    today = get_current_date()
+                    window = range(-handlers.timetable_cache.window_weeks, handlers.timetable_cache.window_weeks + 1)
+                    dates = {get_tomorrow_date(), *(shift_date(today, offset * 7) for offset in window)}
+                    await asyncio.gather(*(
+                        handlers.timetable_cache.get_entry(value, date)
+                        for value in await self.store.distinct_storage_values()
+                        for date in dates
+                    ))
+                for name, button, handler in buttons:
+                    scenarios[f"{name}_{mode}"] = await self._timetable_scenario(handlers, button, handler)
+                if mode == "cold":
+                    scenarios["login"] = await self._login_scenario(handlers)
+                await handlers.close()
+        finally:
+            self.upstream.stop()
+        
+        return {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "params": {key: value for key, value in vars(self.args).items() if key not in ("output", "baseline")},
+            },
+            "scenarios": scenarios,
+        }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"\n{'сценарий':<16}{'rps база':>12}{'rps':>10}{'p95 база':>12}{'p95':>10}")
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        old_rps, new_rps = previous["throughput_rps"], current["throughput_rps"]
+        old_p95, new_p95 = previous["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        print(f"{name:<16}{old_rps:>12}{new_rps:>10}{old_p95:>12}{new_p95:>10}")
+        if old_rps and new_rps < old_rps * (1 - tolerance):
+            regressions.append(f"{name}: пропускная способность {old_rps} -> {new_rps} rps")
+        if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 {old_p95} -> {new_p95} мс")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"{'сценарий':<16}{'rps':>10}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'API':>8}")
+    for name, scenario in result["scenarios"].items():
+        latency = scenario["latency_ms"]
+        print(f"{name:<16}{scenario['throughput_rps']:>10}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{scenario['upstream_requests']:>8}")
+        for stage, stats in scenario["stages_ms"].items():
+            print(f"  {stage:<22} n={stats['count']:<6} p50={stats['p50']:<8} p95={stats['p95']:<8} p99={stats['p99']}")
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчиков бота на фейковых Telegram и API университета")
+    parser.add_argument("--requests", type=int, default=2000, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--lessons-per-day", type=int, default=6)
+    parser.add_argument("--subgroups", type=int, default=6, help="записей rasp на пару; 6x6x6 = 216 на неделю")
+    parser.add_argument("--upstream-delay", type=float, default=0.05, help="задержка API университета, секунд")
+    parser.add_argument("--mongo-latency", type=float, default=0.001, help="задержка хранилища сессий, секунд")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="задержка отправки в Telegram, секунд")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение, доля")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.CRITICAL)
+    random.seed(args.seed)
+    result = await Benchmark(args).run()
+    print_report(result)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
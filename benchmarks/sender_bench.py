@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List
+from telegram import Chat, Message
+from telegram.error import RetryAfter
+from bot.sender import OutboundSender
+
+
+class FloodLimitedBot:
+    def __init__(self, global_limit: int, chat_limit: int, latency: float):
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.latency = latency
+        self.sent = 0
+        self.flood_errors = 0
+        self._recent: Deque[float] = deque()
+        self._recent_by_chat: Dict[int, Deque[float]] = {}
+    
+    def _check(self, chat_id: int) -> None:
+        now = time.monotonic()
+        recent_chat = self._recent_by_chat.setdefault(chat_id, deque())
+        for recent in (self._recent, recent_chat):
+            while recent and now - recent[0] > 1:
+                recent.popleft()
+        if len(self._recent) >= self.global_limit or len(recent_chat) >= self.chat_limit:
+            self.flood_errors += 1
+            raise RetryAfter(1)
+        self._recent.append(now)
+        recent_chat.append(now)
+    
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> Message:
+        await asyncio.sleep(self.latency)
+        self._check(chat_id)
+        self.sent += 1
+        return Message(self.sent, datetime.now(), Chat(chat_id, Chat.PRIVATE), text=text)
+
+
+async def run(args: argparse.Namespace) -> None:
+    bot = FloodLimitedBot(args.telegram_limit, args.telegram_chat_limit, args.latency)
+    sender = OutboundSender(bot, global_rate=args.rate, bulk_rate=args.bulk_rate, chat_rate=1, chat_burst=1,
+                            workers=args.workers)
+    sender.start()
+    latencies: List[float] = []
+    
+    async def interactive(chat_id: int) -> None:
+        started = time.perf_counter()
+        await sender.send(bot, chat_id, "ответ")
+        latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    for chat_id in range(args.bulk):
+        sender.enqueue(chat_id, "рассылка")
+    replies = []
+    for idx in range(args.interactive):
+        await asyncio.sleep(args.interactive_interval)
+        replies.append(asyncio.create_task(interactive(10 ** 6 + idx)))
+    await asyncio.gather(*replies)
+    await sender.join()
+    elapsed = time.perf_counter() - started
+    await sender.stop()
+    
+    latencies.sort()
+    print(f"отправлено={bot.sent} за {elapsed:.1f} с, {bot.sent / elapsed:.1f} сообщ./с (лимит {args.telegram_limit})")
+    print(f"ответов 429={bot.flood_errors}, недоставлено={sum(count for (_, result), count in sender.results.items() if result == 'failed')}")
+    if latencies:
+        print(f"ответы пользователям: p50={latencies[len(latencies) // 2] * 1000:.0f} мс, "
+              f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f} мс, max={latencies[-1] * 1000:.0f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Очередь отправки: пропускная способность при лимитах Telegram и задержка ответов во время рассылки")
+    parser.add_argument("--bulk", type=int, default=600)
+    parser.add_argument("--interactive", type=int, default=100)
+    parser.add_argument("--interactive-interval", type=float, default=0.1)
+    parser.add_argument("--rate", type=float, default=30)
+    parser.add_argument("--bulk-rate", type=float, default=25)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--telegram-limit", type=int, default=30)
+    parser.add_argument("--telegram-chat-limit", type=int, default=1)
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import time
+from bot.api.timetable import TimetableAPI
+from benchmarks.fake_upstream import FakeUpstream
+
+
+async def run(requests: int, concurrency: int, delay: float) -> None:
+    upstream = FakeUpstream(delay=delay)
+    base_url = upstream.start()
+    api = TimetableAPI(max_connections=concurrency, urls={'T': base_url, 'D': base_url})
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch(idx: int):
+        async with semaphore:
+            await api.get_timetable(f"D{idx}")
+    
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch(idx) for idx in range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await api.close()
+        upstream.stop()
+    
+    print(f"concurrency={concurrency:<4} requests={requests:<5} elapsed={elapsed:.2f}s rps={requests / elapsed:.1f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение последовательных и параллельных запросов к API расписания")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="задержка ответа фейкового API, секунд")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+    
+    for concurrency in args.concurrency:
+        await run(args.requests, concurrency, args.delay)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: float = 0.5, window: int = 20, min_requests: int = 5, open_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._results = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+    
+    @property
+    def failure_rate(self) -> float:
+        if not self._results:
+            return 0.0
+        return self._results.count(False) / len(self._results)
+    
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self._results.clear()
+            self.state = self.CLOSED
+        self._probe_in_flight = False
+        self._results.append(True)
+    
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            self._open()
+            return
+        self._results.append(False)
+        if len(self._results) >= self.min_requests and self.failure_rate >= self.failure_threshold:
+            self._open()
+    
+    def release(self) -> None:
+        self._probe_in_flight = False
+    
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
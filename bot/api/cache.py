@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from bot.api.timetable import TimetableAPI, decode_storage_value
+from bot.api.models import WeekTimetable
+from bot.api.snapshot import TimetableSnapshot
+from bot.constants import get_current_date, get_week_start, shift_date
+from bot.storage.shared import SharedCache
+
+logger = logging.getLogger(__name__)
+
+
+class TimetableKey(NamedTuple):
+    university: str
+    entity_id: str
+    is_teacher: bool
+    week: str
+
+
+class CacheEntry:
+    __slots__ = ("week", "fetched_at", "payload_hash", "ok", "restored")
+
+    def __init__(self, week: WeekTimetable, fetched_at: float, payload_hash: str, ok: bool = True,
+                 restored: bool = False):
+        self.week = week
+        self.fetched_at = fetched_at
+        self.payload_hash = payload_hash
+        self.ok = ok
+        self.restored = restored
+    
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], fetched_at: float) -> "CacheEntry":
+        return cls(WeekTimetable.from_payload(payload), fetched_at, hash_payload(payload), payload.get('state') != -1)
+
+
+def hash_payload(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def shared_key(key: TimetableKey) -> str:
+    return f"timetable:{key.university}:{key.entity_id}:{int(key.is_teacher)}:{key.week}"
+
+
+def make_key(storage_value: str, date: str) -> TimetableKey:
+    university, entity_id, is_teacher = decode_storage_value(storage_value)
+    return TimetableKey(university, entity_id, is_teacher, get_week_start(date))
+
+
+class TimetableCache:
+    def __init__(self, api: TimetableAPI, ttl: float = 600, max_size: int = 5000, stale_grace: float = 300,
+                 window_weeks: int = 1, snapshot: Optional[TimetableSnapshot] = None,
+                 shared: Optional[SharedCache] = None):
+        self.api = api
+        self.snapshot = snapshot
+        self.shared = shared
+        self.ttl = ttl
+        self.window_weeks = window_weeks
+        self.max_size = max_size
+        self.stale_grace = stale_grace
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[TimetableKey, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[TimetableKey, asyncio.Future] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def is_outdated(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at > self.ttl + self.stale_grace
+    
+    async def get_timetable(self, storage_value: str, date: Optional[str] = None) -> WeekTimetable:
+        return (await self.get_entry(storage_value, date)).week
+    
+    async def get_entry(self, storage_value: str, date: Optional[str] = None) -> CacheEntry:
+        key = make_key(storage_value, date or get_current_date())
+        return await self.get(key, self._loader(storage_value, key))
+    
+    async def refresh(self, storage_value: str, date: Optional[str] = None) -> CacheEntry:
+        key = make_key(storage_value, date or get_current_date())
+        return await self._single_flight(key, self._loader(storage_value, key), use_shared=False)
+    
+    def prefetch_window(self, storage_value: str, date: str) -> None:
+        # Соседние недели подгружаются в фоне, чтобы навигация по ним не ждала API
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        for offset in range(-self.window_weeks, self.window_weeks + 1):
+            if not offset:
+                continue
+            key = make_key(storage_value, shift_date(date, offset * 7))
+            entry = self._entries.get(key)
+            if entry is None or now - entry.fetched_at > self.ttl:
+                self._revalidate(key, self._loader(storage_value, key))
+    
+    async def get(self, key: TimetableKey, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> CacheEntry:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.time() - entry.fetched_at
+            if age <= self.ttl:
+                self.hits += 1
+                return entry
+            # Запись из снимка отдаётся сразу при любом возрасте: после перезапуска бот не ждёт API университета
+            if age <= self.ttl + self.stale_grace or entry.restored:
+                self.stale_hits += 1
+                self._revalidate(key, loader)
+                return entry
+        
+        self.misses += 1
+        fresh = await self._single_flight(key, loader)
+        if not fresh.ok and entry is not None:
+            # API недоступно: отдаём последнее удачное расписание
+            self.stale_hits += 1
+            return self._entries.get(key, entry)
+        return fresh
+    
+    async def warm_up(self) -> int:
+        if self.snapshot is None:
+            return 0
+        restored = 0
+        rows = await self.snapshot.load(get_week_start(get_current_date()), self.max_size)
+        # Самые свежие записи идут первыми, поэтому вставляем с конца, чтобы они оказались в хвосте LRU
+        for key, fetched_at, payload_hash, week in reversed(rows):
+            key = TimetableKey(*key)
+            if key not in self._entries:
+                self._store(key, CacheEntry(week, fetched_at, payload_hash, restored=True))
+                restored += 1
+        return restored
+    
+    def _loader(self, storage_value: str, key: TimetableKey) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        return lambda: self.api.get_timetable(storage_value, key.week)
+    
+    async def close(self) -> None:
+        inflight = list(self._inflight.values())
+        for future in inflight:
+            future.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+    
+    def invalidate(self, key: TimetableKey) -> None:
+        self._entries.pop(key, None)
+    
+    def _revalidate(self, key: TimetableKey, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+        if key not in self._inflight:
+            future = self._start_load(key, loader)
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    
+    def _start_load(self, key: TimetableKey, loader: Callable[[], Awaitable[Dict[str, Any]]],
+                    use_shared: bool = True) -> asyncio.Future:
+        future = asyncio.ensure_future(self._load(key, loader, use_shared))
+        self._inflight[key] = future
+        return future
+    
+    async def _single_flight(self, key: TimetableKey, loader: Callable[[], Awaitable[Dict[str, Any]]],
+                             use_shared: bool = True) -> CacheEntry:
+        future = self._inflight.get(key) or self._start_load(key, loader, use_shared)
+        return await asyncio.shield(future)
+    
+    async def _load(self, key: TimetableKey, loader: Callable[[], Awaitable[Dict[str, Any]]],
+                    use_shared: bool = True) -> CacheEntry:
+        try:
+            if use_shared and self.shared is not None:
+                entry = await self._load_shared(key)
+                if entry is not None:
+                    self._store(key, entry)
+                    return entry
+            
+            payload = await loader()
+            entry = CacheEntry.from_payload(payload, time.time())
+            if entry.ok:
+                self._store(key, entry)
+                if self.snapshot is not None:
+                    self.snapshot.put(key, entry.fetched_at, entry.payload_hash, payload)
+                if self.shared is not None:
+                    await self._save_shared(key, entry, payload)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _load_shared(self, key: TimetableKey) -> Optional[CacheEntry]:
+        try:
+            raw = await self.shared.get(shared_key(key))
+            if raw is None:
+                return None
+            record = json.loads(zlib.decompress(raw))
+        except Exception as e:
+            logger.warning(f"Ошибка чтения общего кэша расписаний: {e}")
+            return None
+        # Другой процесс мог сохранить запись давно, устаревшую не используем
+        if time.time() - record["fetched_at"] > self.ttl:
+            return None
+        return CacheEntry(WeekTimetable.from_payload(record["payload"]), record["fetched_at"], record["payload_hash"])
+    
+    async def _save_shared(self, key: TimetableKey, entry: CacheEntry, payload: Dict[str, Any]) -> None:
+        record = {"fetched_at": entry.fetched_at, "payload_hash": entry.payload_hash, "payload": payload}
+        try:
+            raw = zlib.compress(json.dumps(record, ensure_ascii=False).encode())
+            await self.shared.set(shared_key(key), raw, self.ttl + self.stale_grace)
+        except Exception as e:
+            logger.warning(f"Ошибка записи общего кэша расписаний: {e}")
+    
+    def _store(self, key: TimetableKey, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,137 @@
+import re
+import sys
+from typing import Any, Dict, List, Tuple
+
+LECTURE = "lecture"
+LAB = "lab"
+PRACTICE = "practice"
+OTHER = "other"
+
+DAY_NUMBER_PATTERN = re.compile(r'\s+\d+$')
+
+
+def classify_lesson(discipline: str) -> str:
+    discipline_lower = discipline.lower()
+    if discipline_lower.startswith('лек'):
+        return LECTURE
+    elif discipline_lower.startswith('лаб'):
+        return LAB
+    elif discipline_lower.startswith('пр'):
+        return PRACTICE
+    return OTHER
+
+
+def _text(item: Dict[str, Any], key: str) -> str:
+    return sys.intern(str(item.get(key) or ''))
+
+
+def _day_name(raw: str) -> str:
+    if raw.startswith('📅 '):
+        raw = raw[2:]
+    return DAY_NUMBER_PATTERN.sub('', raw).strip()
+
+
+class Lesson:
+    __slots__ = ("date", "weekday", "start", "end", "discipline", "lesson_type", "teacher", "group", "room")
+    
+    def __init__(self, date: str, weekday: int, start: str, end: str, discipline: str, lesson_type: str,
+                 teacher: str, group: str, room: str):
+        self.date = date
+        self.weekday = weekday
+        self.start = start
+        self.end = end
+        self.discipline = discipline
+        self.lesson_type = lesson_type
+        self.teacher = teacher
+        self.group = group
+        self.room = room
+    
+    def fingerprint(self) -> Tuple[str, ...]:
+        return (self.date, self.start, self.end, self.discipline, self.teacher, self.group, self.room)
+    
+    def identity(self) -> Tuple[str, ...]:
+        return (self.discipline, self.teacher, self.group)
+    
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> "Lesson":
+        discipline = _text(item, 'дисциплина')
+        weekday = item.get('деньНедели') or 0
+        return cls(
+            date=sys.intern(str(item.get('дата') or '')[:10]),
+            weekday=weekday if isinstance(weekday, int) else 0,
+            start=_text(item, 'начало'),
+            end=_text(item, 'конец'),
+            discipline=discipline,
+            lesson_type=classify_lesson(discipline),
+            teacher=_text(item, 'преподаватель'),
+            group=_text(item, 'группа'),
+            room=_text(item, 'аудитория'),
+        )
+
+
+class WeekTimetable:
+    __slots__ = ("lessons", "by_date", "by_weekday", "day_names")
+    
+    def __init__(self, lessons: List[Lesson], day_names: Dict[int, str]):
+        self.lessons: Tuple[Lesson, ...] = tuple(lessons)
+        self.day_names = day_names
+        by_date: Dict[str, List[Lesson]] = {}
+        by_weekday: Dict[int, List[Lesson]] = {}
+        for lesson in self.lessons:
+            by_date.setdefault(lesson.date, []).append(lesson)
+            if 1 <= lesson.weekday <= 7:
+                by_weekday.setdefault(lesson.weekday, []).append(lesson)
+        self.by_date: Dict[str, Tuple[Lesson, ...]] = {key: tuple(value) for key, value in by_date.items()}
+        self.by_weekday: Dict[int, Tuple[Lesson, ...]] = {key: tuple(value) for key, value in sorted(by_weekday.items())}
+    
+    def __len__(self) -> int:
+        return len(self.lessons)
+    
+    def on_date(self, date: str) -> Tuple[Lesson, ...]:
+        return self.by_date.get(date, ())
+    
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "WeekTimetable":
+        items = (payload.get('data') or {}).get('rasp') or []
+        lessons = []
+        day_names: Dict[int, str] = {}
+        for item in items:
+            lesson = Lesson.from_item(item)
+            lessons.append(lesson)
+            if 1 <= lesson.weekday <= 7 and lesson.weekday not in day_names:
+                day_names[lesson.weekday] = sys.intern(_day_name(str(item.get('день_недели') or '')))
+        return cls(lessons, day_names)
+
+
+class WeekDiff:
+    __slots__ = ("added", "removed", "moved")
+    
+    def __init__(self, added: List[Lesson], removed: List[Lesson], moved: List[Tuple[Lesson, Lesson]]):
+        self.added = added
+        self.removed = removed
+        self.moved = moved
+    
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+
+def diff_weeks(old: WeekTimetable, new: WeekTimetable, since_date: str = "") -> WeekDiff:
+    old_lessons = {lesson.fingerprint(): lesson for lesson in old.lessons if lesson.date >= since_date}
+    new_lessons = {lesson.fingerprint(): lesson for lesson in new.lessons if lesson.date >= since_date}
+    removed = [lesson for key, lesson in old_lessons.items() if key not in new_lessons]
+    added = [lesson for key, lesson in new_lessons.items() if key not in old_lessons]
+    
+    moved = []
+    unmatched: Dict[Tuple[str, ...], List[Lesson]] = {}
+    for lesson in added:
+        unmatched.setdefault(lesson.identity(), []).append(lesson)
+    still_removed = []
+    for lesson in removed:
+        candidates = unmatched.get(lesson.identity())
+        if candidates:
+            moved.append((lesson, candidates.pop(0)))
+        else:
+            still_removed.append(lesson)
+    still_added = [lesson for lessons in unmatched.values() for lesson in lessons]
+    
+    return WeekDiff(still_added, still_removed, moved)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from bot.api.models import WeekTimetable
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timetables (
+    university TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    is_teacher INTEGER NOT NULL,
+    week TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload_hash TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (university, entity_id, is_teacher, week)
+)
+"""
+
+UPSERT = """
+INSERT OR REPLACE INTO timetables (university, entity_id, is_teacher, week, fetched_at, payload_hash, payload)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class TimetableSnapshot:
+    def __init__(self, path: str, retention: float = 7 * 24 * 3600, flush_interval: float = 5,
+                 compact_interval: float = 6 * 3600):
+        self.path = path
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._compacted_at = time.monotonic()
+    
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._loop(), name="snapshot")
+    
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._db is not None:
+            await self.flush()
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+    
+    def put(self, key: tuple, fetched_at: float, payload_hash: str, payload: Dict[str, Any]) -> None:
+        if self._db is None:
+            return
+        # Запись откладывается до следующего сброса, повторные загрузки того же ключа схлопываются
+        self._pending[key] = (*key, fetched_at, payload_hash, payload)
+    
+    async def flush(self) -> None:
+        if not self._pending or self._db is None:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, list(pending.values()))
+        except Exception as e:
+            logger.error(f"Ошибка сохранения снимка расписаний: {e}")
+    
+    async def load(self, since_week: str, limit: int) -> List[Tuple[tuple, float, str, WeekTimetable]]:
+        if self._db is None:
+            return []
+        return await asyncio.to_thread(self._read, since_week, limit)
+    
+    async def compact(self) -> None:
+        if self._db is None:
+            return
+        removed = await asyncio.to_thread(self._compact, time.time() - self.retention)
+        self._compacted_at = time.monotonic()
+        logger.info(f"Снимок расписаний сжат, удалено записей: {removed}")
+    
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if self.compact_interval and time.monotonic() - self._compacted_at >= self.compact_interval:
+                try:
+                    await self.compact()
+                except Exception as e:
+                    logger.error(f"Ошибка сжатия снимка расписаний: {e}")
+    
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(SCHEMA)
+        self._db = db
+    
+    def _write(self, rows: List[tuple]) -> None:
+        encoded = [
+            (*row[:6], zlib.compress(json.dumps(row[6], ensure_ascii=False).encode()))
+            for row in rows
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(UPSERT, encoded)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+    
+    def _read(self, since_week: str, limit: int) -> List[Tuple[tuple, float, str, WeekTimetable]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT university, entity_id, is_teacher, week, fetched_at, payload_hash, payload FROM timetables "
+                "WHERE week >= ? AND fetched_at >= ? ORDER BY fetched_at DESC LIMIT ?",
+                (since_week, time.time() - self.retention, limit),
+            ).fetchall()
+        
+        result = []
+        for university, entity_id, is_teacher, week, fetched_at, payload_hash, payload in rows:
+            try:
+                timetable = WeekTimetable.from_payload(json.loads(zlib.decompress(payload)))
+            except (ValueError, zlib.error) as e:
+                logger.warning(f"Пропущена повреждённая запись снимка {university}{entity_id}: {e}")
+                continue
+            result.append(((university, entity_id, bool(is_teacher), week), fetched_at, payload_hash, timetable))
+        return result
+    
+    def _compact(self, expire_before: float) -> int:
+        with self._lock:
+            removed = self._db.execute("DELETE FROM timetables WHERE fetched_at < ?", (expire_before,)).rowcount
+            if removed:
+                self._db.execute("VACUUM")
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
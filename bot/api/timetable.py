@@ -1,79 +1,132 @@
 import logging
-import requests
-from typing import Dict, Any
+import time
+import httpx
+from typing import Dict, Any, Optional, Tuple
+from bot.api.breaker import CircuitBreaker, CircuitOpenError
+from bot.metrics import UPSTREAM_DURATION, UPSTREAM_RESPONSES
 from bot.constants import TPI_DGTY_API_URL, DGTY_API_URL, AUTH_PATH, GET_STUDENT_PATH, GET_TEACHER_PATH, get_current_date
 
 logger = logging.getLogger(__name__)
 
+UNIVERSITY_URLS = {
+    'T': TPI_DGTY_API_URL,
+    'D': DGTY_API_URL,
+}
+
+
+def decode_storage_value(storage_value: str) -> Tuple[str, str, bool]:
+    is_teacher = storage_value.endswith('T')
+    value = storage_value[:-1] if is_teacher else storage_value
+    
+    if value.startswith('T') or value.startswith('D'):
+        value = value[1:]
+    
+    university_type = storage_value[0] if storage_value else 'D'
+    return university_type, value, is_teacher
+
 
 class TimetableAPI:
-    TIMEOUT = 10
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 10
+    MAX_CONNECTIONS = 20
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        max_connections: int = MAX_CONNECTIONS,
+        urls: Optional[Dict[str, str]] = None,
+        breakers: Optional[Dict[str, CircuitBreaker]] = None,
+    ):
+        self.urls = urls or UNIVERSITY_URLS
+        self.breakers = breakers or {university_type: CircuitBreaker() for university_type in self.urls}
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        headers = {
             'Content-Type': 'application/json',
             'User-Agent': 'DGTY-Timetable-Bot/1.0'
-        })
+        }
+        # Отдельный пул на каждый хост: лимит соединений действует per-host
+        self.clients: Dict[str, httpx.AsyncClient] = {
+            university_type: httpx.AsyncClient(base_url=url, headers=headers, timeout=timeout, limits=limits)
+            for university_type, url in self.urls.items()
+        }
     
-    def _get_university_url(self, university_type: str) -> str:
-        if university_type.startswith('T'):
-            return TPI_DGTY_API_URL
-        elif university_type.startswith('D'):
-            return DGTY_API_URL
-        return ""
+    async def close(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
     
-    def _make_request(self, method: str, url: str, error_msg: str, **kwargs) -> requests.Response:
+    def _get_client(self, university_type: str) -> httpx.AsyncClient:
+        client = self.clients.get(university_type[:1])
+        if client is None:
+            raise ValueError(f"Неизвестный университет: {university_type}")
+        return client
+    
+    async def _make_request(self, method: str, university_type: str, path: str, error_msg: str, **kwargs) -> httpx.Response:
         try:
-            response = self.session.request(method, url, timeout=self.TIMEOUT, **kwargs)
+            client = self._get_client(university_type)
+            university = client.base_url.host
+            breaker = self.breakers[university_type[:1]]
+            if not breaker.allow():
+                UPSTREAM_RESPONSES.inc(university=university, endpoint=path, status="circuit_open")
+                raise CircuitOpenError(f"API университета {university_type} временно недоступно")
+            
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                UPSTREAM_RESPONSES.inc(university=university, endpoint=path, status="error")
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            finally:
+                UPSTREAM_DURATION.observe(time.perf_counter() - started, university=university, endpoint=path)
+            
+            UPSTREAM_RESPONSES.inc(university=university, endpoint=path, status=str(response.status_code))
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             response.raise_for_status()
             return response
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"{error_msg}: {e}")
             raise
     
-    def auth_user(self, university_type: str, username: str, password: str) -> Dict[str, Any]:
-        url = self._get_university_url(university_type) + AUTH_PATH
+    async def auth_user(self, university_type: str, username: str, password: str) -> Dict[str, Any]:
         payload = {"username": username, "password": password}
-        response = self._make_request("POST", url, "Ошибка авторизации", json=payload)
+        response = await self._make_request("POST", university_type, AUTH_PATH, "Ошибка авторизации", json=payload)
         return response.json()
     
-    def get_student_group_id(self, university_type: str, access_token: str, student_id: str) -> int:
-        url = self._get_university_url(university_type) + GET_STUDENT_PATH
-        cookies = {'authToken': access_token}
+    async def get_student_group_id(self, university_type: str, access_token: str, student_id: str) -> int:
+        headers = {'Cookie': f'authToken={access_token}'}
         params = {'studentID': student_id}
-        response = self._make_request("GET", url, "Ошибка получения ID группы", cookies=cookies, params=params)
+        response = await self._make_request(
+            "GET", university_type, GET_STUDENT_PATH, "Ошибка получения ID группы", headers=headers, params=params
+        )
         data = response.json()
         return data['data']['group']['item2']
     
-    def get_teacher_id(self, university_type: str, access_token: str, user_id: str) -> int:
-        url = self._get_university_url(university_type) + GET_TEACHER_PATH
-        cookies = {'authToken': access_token}
+    async def get_teacher_id(self, university_type: str, access_token: str, user_id: str) -> int:
+        headers = {'Cookie': f'authToken={access_token}'}
         params = {'userID': user_id}
-        response = self._make_request("GET", url, "Ошибка получения ID преподавателя", cookies=cookies, params=params)
+        response = await self._make_request(
+            "GET", university_type, GET_TEACHER_PATH, "Ошибка получения ID преподавателя", headers=headers, params=params
+        )
         data = response.json()
         return data['data']['teacherID']
     
-    def get_timetable(self, storage_value: str) -> Dict[str, Any]:
-        if storage_value.endswith('T'):
-            param_name = 'idTeacher'
-            value = storage_value[:-1]
-        else:
-            param_name = 'idGroup'
-            value = storage_value
-        
-        if value.startswith('T') or value.startswith('D'):
-            value = value[1:]
-        
-        university_type = storage_value[0] if storage_value else 'D'
-        base_url = self._get_university_url(university_type)
-        
-        url = f"{base_url}/Rasp"
-        params = {param_name: value, 'sdate': get_current_date()}
+    async def get_timetable(self, storage_value: str, sdate: Optional[str] = None) -> Dict[str, Any]:
+        university_type, value, is_teacher = decode_storage_value(storage_value)
+        param_name = 'idTeacher' if is_teacher else 'idGroup'
+        params = {param_name: value, 'sdate': sdate or get_current_date()}
         
         try:
-            response = self._make_request("GET", url, "Ошибка получения расписания", params=params)
+            response = await self._make_request("GET", university_type, "/Rasp", "Ошибка получения расписания", params=params)
             return response.json()
         except Exception as e:
-            logger.error(f"Ошибка получения расписания: {e}")
             return {'data': {'rasp': []}, 'state': -1, 'msg': str(e)}
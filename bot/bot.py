@@ -1,31 +1,92 @@
 import asyncio
+import hmac
+import json
 import logging
+import queue
+from typing import Any, Dict, Optional
 from telegram import Update
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
     filters,
 )
 from bot.config import Config
 from bot.handlers import Handlers
+from bot.menu import NAVIGATION_PREFIX
+from bot.dispatcher import PerUserUpdateProcessor
+from bot.scheduler import PrefetchScheduler, parse_schedule
+from bot.digest import DigestScheduler
+from bot.watcher import ChangeWatcher
+from bot.web import Request, Response, WebApp, WebServer
+from bot.metrics import REGISTRY, CallbackMetric
+from bot.api.breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+INBOX_POLL_INTERVAL = 1
+
 MENU_BUTTONS = ["📖 Сегодня", "📖 Завтра", "📖 Неделя", "ℹ Помощь", "🔑 Авторизация", "🚪 Выход"]
 
 
 class TelegramBot:
-    def __init__(self, config: Config):
-        self.handlers = Handlers(config)
-        self.application = Application.builder().token(config.bot_token).build()
+    def __init__(self, config: Config, shard: Optional[int] = None, inbox: Optional[Any] = None):
+        self.config = config
+        self.shard = shard
+        self.inbox = inbox
+        # Фоновые задачи и рассылки выполняет только один процесс
+        self.is_leader = not shard
+        self.dispatcher = PerUserUpdateProcessor(config.max_concurrent_updates, trace_log=config.trace_updates)
+        builder = Application.builder().token(config.bot_token).concurrent_updates(self.dispatcher)
+        if config.run_mode == "webhook" or inbox is not None:
+            builder = builder.updater(None)
+        self.application = builder.build()
+        self.handlers = Handlers(config, bot=self.application.bot, shard=shard)
+        self.web_app = WebApp()
+        self.web_server: Optional[WebServer] = None
+        self._stopped = asyncio.Event()
+        self._inbox_task: Optional[asyncio.Task] = None
+        if config.run_mode == "webhook" and inbox is None:
+            self.web_app.add_route("POST", f"/{config.webhook_path}", self._webhook_handler)
+        if config.metrics_enabled:
+            self.web_app.add_route("GET", "/metrics", self._metrics_handler)
+        if self.handlers.calendar is not None:
+            self.web_app.add_prefix_route("GET", f"/{config.calendar_path}/", self.handlers.calendar.handle)
+        self.prefetch = PrefetchScheduler(
+            self.handlers.timetable_cache,
+            self.handlers.sessions,
+            parse_schedule(config.prefetch_schedule),
+            concurrency=config.prefetch_concurrency,
+            rate=config.prefetch_rate,
+        )
+        self.digest = DigestScheduler(
+            self.handlers.timetable_cache,
+            self.handlers.render_cache,
+            self.handlers.sessions,
+            self.handlers.sender,
+            concurrency=config.prefetch_concurrency,
+        )
+        self.watcher = ChangeWatcher(
+            self.handlers.timetable_cache,
+            self.handlers.sessions,
+            self.handlers.sender,
+            parse_schedule(config.watch_schedule),
+            concurrency=config.prefetch_concurrency,
+            rate=config.prefetch_rate,
+        )
         self._register_handlers()
+        self._register_metrics()
     
     def _register_handlers(self):
         command_handlers = [
             ("start", self.handlers.start_handler),
             ("l", self.handlers.login_command),
             ("login", self.handlers.login_handler),
+            ("digest", self.handlers.digest_handler),
+            ("calendar", self.handlers.calendar_handler),
         ]
         
         for command, handler in command_handlers:
@@ -43,23 +104,124 @@ class TelegramBot:
         for pattern, handler in menu_handlers:
             self.application.add_handler(MessageHandler(filters.Regex(pattern), handler))
         
+        self.application.add_handler(CallbackQueryHandler(
+            self.handlers.navigation_handler, pattern=f"^{NAVIGATION_PREFIX}:"
+        ))
+        
         menu_pattern = "|".join(f"^{btn}$" for btn in MENU_BUTTONS)
         self.application.add_handler(MessageHandler(
             filters.TEXT & ~filters.COMMAND & ~filters.Regex(f"^({menu_pattern})$"),
             self.handlers.text_message_handler
         ))
     
+    def _register_metrics(self):
+        cache = self.handlers.timetable_cache
+        render_cache = self.handlers.render_cache
+        sessions = self.handlers.sessions
+        
+        REGISTRY.register(CallbackMetric(
+            "bot_updates_in_flight", "Обновления в обработке", "gauge",
+            lambda: {(): self.dispatcher.in_flight},
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_updates_queued", "Обновления, ожидающие обработки", "gauge",
+            lambda: {(): self.dispatcher.queued + self.application.update_queue.qsize()},
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_cache_requests_total", "Обращения к кэшам", "counter",
+            lambda: {
+                ("timetable", "hit"): cache.hits,
+                ("timetable", "stale"): cache.stale_hits,
+                ("timetable", "miss"): cache.misses,
+                ("render", "hit"): render_cache.hits,
+                ("render", "miss"): render_cache.misses,
+                ("session", "hit"): sessions.hits,
+                ("session", "miss"): sessions.misses,
+            },
+            ("cache", "result"),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_cache_entries", "Записей в кэшах", "gauge",
+            lambda: {("timetable",): len(cache), ("render",): len(render_cache), ("session",): len(sessions)},
+            ("cache",),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_login_queue", "Входы в очереди на проверку", "gauge",
+            lambda: {("queued",): self.handlers.login_queue.pending, ("in_progress",): self.handlers.login_queue.in_progress},
+            ("state",),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_logins_total", "Результаты проверки входа", "counter",
+            lambda: {(result,): count for result, count in self.handlers.login_queue.results.items()},
+            ("result",),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_outbound_queue", "Сообщения в очереди на отправку в Telegram", "gauge",
+            lambda: {(priority,): count for priority, count in self.handlers.sender.pending_by_priority().items()},
+            ("priority",),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_outbound_messages_total", "Отправленные и недоставленные сообщения", "counter",
+            lambda: {key: count for key, count in self.handlers.sender.results.items()},
+            ("priority", "result"),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_outbound_retry_after_total", "Ответы Telegram 429 с паузой отправки", "counter",
+            lambda: {(): self.handlers.sender.retry_after},
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_circuit_breaker_open", "Запросы к API университета приостановлены", "gauge",
+            lambda: {
+                (client.base_url.host,): int(self.handlers.api.breakers[university_type].state != CircuitBreaker.CLOSED)
+                for university_type, client in self.handlers.api.clients.items()
+            },
+            ("university",),
+        ))
+        if self.handlers.calendar is not None:
+            calendar = self.handlers.calendar
+            REGISTRY.register(CallbackMetric(
+                "bot_calendar_responses_total", "Ответы на запросы календаря", "counter",
+                lambda: {(status,): count for status, count in calendar.responses.items()},
+                ("status",),
+            ))
+            REGISTRY.register(CallbackMetric(
+                "bot_calendar_weeks_rendered_total", "Недели, заново отрисованные в iCalendar", "counter",
+                lambda: {(): calendar.rendered},
+            ))
+    
+    async def _metrics_handler(self, request: Request) -> Response:
+        return Response(REGISTRY.render().encode(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    async def _start_web_server(self, port: int):
+        self.web_server = WebServer(self.web_app, self.config.web_host, port)
+        await self.web_server.start()
+    
     async def start(self):
         try:
+            await self.handlers.initialize()
             await self.application.initialize()
             await self.application.start()
-            await self.application.updater.start_polling(
-                allowed_updates=Update.ALL_TYPES,
-                drop_pending_updates=True
-            )
-            
-            await asyncio.Event().wait()
+            if self.inbox is not None:
+                if self.config.metrics_enabled or self.handlers.calendar is not None:
+                    await self._start_web_server(self.config.web_port + 1 + self.shard)
+                self._inbox_task = asyncio.create_task(self._consume_inbox(), name="inbox")
+            else:
+                if self.config.run_mode == "webhook" or self.config.metrics_enabled or self.handlers.calendar is not None:
+                    await self._start_web_server(self.config.web_port)
+                if self.config.run_mode == "webhook":
+                    await self._start_webhook()
+                else:
+                    await self.application.updater.start_polling(
+                        allowed_updates=ALLOWED_UPDATES,
+                        drop_pending_updates=True
+                    )
+            if self.is_leader:
+                self.prefetch.start()
+                self.digest.start()
+                self.watcher.start()
             
+            await self._stopped.wait()
+        
         except (KeyboardInterrupt, asyncio.CancelledError):
             pass
         except Exception as e:
@@ -67,10 +229,71 @@ class TelegramBot:
         finally:
             await self._shutdown()
     
+    async def _start_webhook(self):
+        await self.application.bot.set_webhook(
+            url=f"{self.config.webhook_url.rstrip('/')}/{self.config.webhook_path}",
+            secret_token=self.config.webhook_secret,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=min(self.config.max_concurrent_updates, 100),
+        )
+    
+    async def _webhook_handler(self, request: Request) -> Response:
+        secret = request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(secret, self.config.webhook_secret):
+            return Response(b"forbidden", status=403)
+        
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            return Response(b"bad request", status=400)
+        if not isinstance(data, dict):
+            return Response(b"bad request", status=400)
+        
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except (KeyError, TypeError, ValueError):
+            # Иначе ответ 500, и Telegram повторял бы доставку того же тела без конца
+            return Response(b"bad request", status=400)
+        if update is not None:
+            await self.application.update_queue.put(update)
+        return Response(b"ok")
+    
+    def _read_inbox(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.inbox.get(timeout=INBOX_POLL_INTERVAL)
+        except queue.Empty:
+            return {}
+    
+    async def _consume_inbox(self):
+        # Обновления от фронтового процесса; None означает остановку
+        while True:
+            data = await asyncio.to_thread(self._read_inbox)
+            if data is None:
+                break
+            if not data:
+                continue
+            try:
+                update = Update.de_json(data, self.application.bot)
+            except Exception as e:
+                logger.error(f"Не удалось разобрать обновление: {e}")
+                continue
+            if update is not None:
+                await self.application.update_queue.put(update)
+        self._stopped.set()
+    
     async def _shutdown(self):
         try:
-            await self.application.updater.stop()
+            if self._inbox_task is not None:
+                self._inbox_task.cancel()
+            await self.prefetch.stop()
+            await self.digest.stop()
+            await self.watcher.stop()
+            if self.web_server is not None:
+                await self.web_server.stop()
+            if self.application.updater is not None:
+                await self.application.updater.stop()
             await self.application.stop()
             await self.application.shutdown()
+            await self.handlers.close()
         except Exception as e:
             logger.error(f"Ошибка при остановке: {e}")
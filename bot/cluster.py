@@ -0,0 +1,182 @@
+import asyncio
+import hmac
+import json
+import logging
+import multiprocessing
+import zlib
+from typing import Any, Dict, List, Optional
+from telegram import Bot
+from telegram.error import TelegramError
+from bot.bot import ALLOWED_UPDATES, SECRET_TOKEN_HEADER, TelegramBot
+from bot.config import Config
+from bot.metrics import REGISTRY, CallbackMetric
+from bot.web import Request, Response, WebApp, WebServer
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30
+POLL_RETRY_DELAY = 5
+SUPERVISE_INTERVAL = 5
+WORKER_STOP_TIMEOUT = 30
+
+
+def update_user_id(data: Dict[str, Any]) -> Optional[int]:
+    for key, value in data.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return None
+
+
+def shard_for(user_id: Optional[int], workers: int) -> int:
+    if user_id is None:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % workers
+
+
+def run_worker(shard: int, inbox: Any) -> None:
+    try:
+        asyncio.run(TelegramBot(Config(), shard=shard, inbox=inbox).start())
+    except KeyboardInterrupt:
+        pass
+
+
+class ClusterFront:
+    def __init__(self, config: Config):
+        self.config = config
+        self.context = multiprocessing.get_context("spawn")
+        self.inboxes = [self.context.Queue() for _ in range(config.workers)]
+        self.workers: List[Any] = [None] * config.workers
+        self.routed = [0] * config.workers
+        self.restarts = 0
+        self.bot = Bot(config.bot_token)
+        self.web_app = WebApp()
+        self.web_server: Optional[WebServer] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        if config.run_mode == "webhook":
+            self.web_app.add_route("POST", f"/{config.webhook_path}", self._webhook_handler)
+        if config.metrics_enabled:
+            self.web_app.add_route("GET", "/metrics", self._metrics_handler)
+            self._register_metrics()
+    
+    def _register_metrics(self):
+        REGISTRY.register(CallbackMetric(
+            "bot_cluster_routed_total", "Обновления, переданные рабочим процессам", "counter",
+            lambda: {(str(shard),): count for shard, count in enumerate(self.routed)},
+            ("worker",),
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_cluster_workers_alive", "Работающие рабочие процессы", "gauge",
+            lambda: {(): sum(1 for worker in self.workers if worker is not None and worker.is_alive())},
+        ))
+        REGISTRY.register(CallbackMetric(
+            "bot_cluster_worker_restarts_total", "Перезапуски рабочих процессов", "counter",
+            lambda: {(): self.restarts},
+        ))
+    
+    async def _metrics_handler(self, request: Request) -> Response:
+        return Response(REGISTRY.render().encode(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    def _spawn(self, shard: int) -> None:
+        worker = self.context.Process(target=run_worker, args=(shard, self.inboxes[shard]), name=f"worker-{shard}")
+        worker.start()
+        self.workers[shard] = worker
+    
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for shard, worker in enumerate(self.workers):
+                if not worker.is_alive():
+                    # Очередь шарда живёт во фронте, поэтому новый процесс продолжит с того же места
+                    logger.error(f"Рабочий процесс {shard} завершился с кодом {worker.exitcode}, перезапуск")
+                    self.restarts += 1
+                    self._spawn(shard)
+    
+    def route(self, data: Dict[str, Any]) -> None:
+        shard = shard_for(update_user_id(data), len(self.inboxes))
+        self.inboxes[shard].put(data)
+        self.routed[shard] += 1
+    
+    async def start(self):
+        try:
+            for shard in range(len(self.workers)):
+                self._spawn(shard)
+            self._supervisor = asyncio.create_task(self._supervise(), name="supervisor")
+            logger.info(f"Запущено рабочих процессов: {len(self.workers)}")
+            
+            await self.bot.initialize()
+            if self.config.run_mode == "webhook" or self.config.metrics_enabled:
+                self.web_server = WebServer(self.web_app, self.config.web_host, self.config.web_port)
+                await self.web_server.start()
+            if self.config.run_mode == "webhook":
+                await self._start_webhook()
+                await asyncio.Event().wait()
+            else:
+                await self._poll()
+        
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.error(f"Критическая ошибка: {e}", exc_info=True)
+        finally:
+            await self._shutdown()
+    
+    async def _start_webhook(self):
+        await self.bot.set_webhook(
+            url=f"{self.config.webhook_url.rstrip('/')}/{self.config.webhook_path}",
+            secret_token=self.config.webhook_secret,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=min(self.config.max_concurrent_updates * len(self.workers), 100),
+        )
+    
+    async def _webhook_handler(self, request: Request) -> Response:
+        secret = request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(secret, self.config.webhook_secret):
+            return Response(b"forbidden", status=403)
+        
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            return Response(b"bad request", status=400)
+        
+        if isinstance(data, dict):
+            self.route(data)
+        return Response(b"ok")
+    
+    async def _poll(self):
+        await self.bot.delete_webhook(drop_pending_updates=True)
+        offset = None
+        while True:
+            try:
+                updates = await self.bot.get_updates(offset=offset, timeout=POLL_TIMEOUT, allowed_updates=ALLOWED_UPDATES)
+            except TelegramError as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(POLL_RETRY_DELAY)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                self.route(update.to_dict())
+    
+    async def _shutdown(self):
+        try:
+            if self._supervisor is not None:
+                self._supervisor.cancel()
+            if self.web_server is not None:
+                await self.web_server.stop()
+            for inbox in self.inboxes:
+                inbox.put(None)
+            for worker in self.workers:
+                if worker is None:
+                    continue
+                await asyncio.to_thread(worker.join, WORKER_STOP_TIMEOUT)
+                if worker.is_alive():
+                    logger.error(f"Рабочий процесс {worker.name} не остановился, завершаем принудительно")
+                    worker.terminate()
+            await self.bot.shutdown()
+        except Exception as e:
+            logger.error(f"Ошибка при остановке: {e}")
@@ -7,10 +7,91 @@ class Config:
         self.mongo_uri: str = self._get_env('MONGO_URI', '')
         self.mongo_db: str = self._get_env('MONGO_DB', '')
         self.mongo_collection: str = self._get_env('MONGO_COLLECTION', '')
+        self.timetable_cache_ttl: int = self._get_int_env('TIMETABLE_CACHE_TTL', 600)
+        self.timetable_cache_size: int = self._get_int_env('TIMETABLE_CACHE_SIZE', 5000)
+        self.timetable_stale_grace: int = self._get_int_env('TIMETABLE_STALE_GRACE', 300)
+        self.timetable_window_weeks: int = self._get_int_env('TIMETABLE_WINDOW_WEEKS', 1)
+        self.session_cache_size: int = self._get_int_env('SESSION_CACHE_SIZE', 100000)
+        self.session_cache_ttl: int = self._get_int_env('SESSION_CACHE_TTL', 0)
+        self.snapshot_path: str = self._get_env('SNAPSHOT_PATH', 'data/timetables.sqlite3')
+        self.snapshot_retention_hours: int = self._get_int_env('SNAPSHOT_RETENTION_HOURS', 168)
+        self.snapshot_flush_interval: int = self._get_int_env('SNAPSHOT_FLUSH_INTERVAL', 5)
+        self.snapshot_compact_interval: int = self._get_int_env('SNAPSHOT_COMPACT_INTERVAL', 6)
+        self.prefetch_schedule: str = self._get_env('PREFETCH_SCHEDULE', '07:20-09:00/10')
+        self.prefetch_concurrency: int = self._get_int_env('PREFETCH_CONCURRENCY', 5)
+        self.prefetch_rate: int = self._get_int_env('PREFETCH_RATE', 10)
+        self.watch_schedule: str = self._get_env('WATCH_SCHEDULE', '06:00-22:00/30')
+        self.send_rate: int = self._get_int_env('SEND_RATE', 30)
+        self.broadcast_rate: int = self._get_int_env('BROADCAST_RATE', 25)
+        self.send_chat_rate: int = self._get_int_env('SEND_CHAT_RATE', 1)
+        self.send_chat_burst: int = self._get_int_env('SEND_CHAT_BURST', 3)
+        self.send_workers: int = self._get_int_env('SEND_WORKERS', 8)
+        self.upstream_connect_timeout: int = self._get_int_env('UPSTREAM_CONNECT_TIMEOUT', 5)
+        self.upstream_read_timeout: int = self._get_int_env('UPSTREAM_READ_TIMEOUT', 10)
+        self.upstream_max_connections: int = self._get_int_env('UPSTREAM_MAX_CONNECTIONS', 20)
+        self.login_workers: int = self._get_int_env('LOGIN_WORKERS', 10)
+        self.login_queue_size: int = self._get_int_env('LOGIN_QUEUE_SIZE', 1000)
+        self.login_university_concurrency: int = self._get_int_env('LOGIN_UNIVERSITY_CONCURRENCY', 5)
+        self.login_state_ttl: int = self._get_int_env('LOGIN_STATE_TTL', 86400)
+        self.login_check_timeout: int = self._get_int_env('LOGIN_CHECK_TIMEOUT', 300)
+        self.breaker_failure_threshold: int = self._get_int_env('BREAKER_FAILURE_THRESHOLD', 50)
+        self.breaker_window: int = self._get_int_env('BREAKER_WINDOW', 20)
+        self.breaker_min_requests: int = self._get_int_env('BREAKER_MIN_REQUESTS', 5)
+        self.breaker_open_seconds: int = self._get_int_env('BREAKER_OPEN_SECONDS', 30)
+        self.run_mode: str = self._get_env('RUN_MODE', 'polling')
+        self.max_concurrent_updates: int = self._get_int_env('MAX_CONCURRENT_UPDATES', 64)
+        self.web_host: str = self._get_env('WEB_HOST', '0.0.0.0')
+        self.web_port: int = self._get_int_env('WEB_PORT', 8080)
+        self.webhook_url: str = self._get_env('WEBHOOK_URL', '')
+        self.webhook_path: str = self._get_env('WEBHOOK_PATH', 'telegram')
+        self.webhook_secret: str = self._get_env('WEBHOOK_SECRET', '')
+        self.workers: int = self._get_int_env('WORKERS', 1)
+        self.shared_cache: str = self._get_env('SHARED_CACHE', '')
+        self.shared_cache_collection: str = self._get_env('SHARED_CACHE_COLLECTION', 'timetable_cache')
+        self.calendar_secret: str = self._get_env('CALENDAR_SECRET', '')
+        self.calendar_url: str = self._get_env('CALENDAR_URL', '')
+        self.calendar_path: str = self._get_env('CALENDAR_PATH', 'calendar')
+        self.calendar_weeks: int = self._get_int_env('CALENDAR_WEEKS', 4)
+        self.calendar_max_weeks: int = self._get_int_env('CALENDAR_MAX_WEEKS', 12)
+        self.calendar_refresh: int = self._get_int_env('CALENDAR_REFRESH', 900)
+        self.metrics_enabled: bool = self._get_bool_env('METRICS_ENABLED', False)
+        self.trace_updates: bool = self._get_bool_env('TRACE_UPDATES', False)
         
         if not self.bot_token:
             raise ValueError("BOT_TOKEN обязателен для работы бота")
+        if self.run_mode not in ('polling', 'webhook'):
+            raise ValueError("RUN_MODE должен быть polling или webhook")
+        if self.workers < 1:
+            raise ValueError("WORKERS должен быть не меньше 1")
+        if self.shared_cache not in ('', 'memory', 'mongo'):
+            raise ValueError("SHARED_CACHE должен быть пустым, memory или mongo")
+        if self.workers > 1:
+            # Прогрев кэша идёт только в процессе 0, остальные процессы получают расписания через общий кэш
+            self.shared_cache = self.shared_cache or 'mongo'
+            if self.shared_cache != 'mongo':
+                raise ValueError("При WORKERS больше 1 SHARED_CACHE должен быть mongo")
+        if self.calendar_secret and not self.calendar_url:
+            raise ValueError("Для CALENDAR_SECRET обязателен CALENDAR_URL")
+        if self.run_mode == 'webhook' and not (self.webhook_url and self.webhook_secret):
+            raise ValueError("Для RUN_MODE=webhook обязательны WEBHOOK_URL и WEBHOOK_SECRET")
     
     @staticmethod
     def _get_env(key: str, default: str = '') -> str:
         return os.getenv(key, default)
+    
+    @classmethod
+    def _get_int_env(cls, key: str, default: int) -> int:
+        value = cls._get_env(key)
+        if not value:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{key} должен быть целым числом")
+    
+    @classmethod
+    def _get_bool_env(cls, key: str, default: bool) -> bool:
+        value = cls._get_env(key)
+        if not value:
+            return default
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
@@ -18,3 +18,17 @@ def get_current_date() -> str:
 def get_tomorrow_date() -> str:
     tomorrow = datetime.now(MOSCOW_TZ) + timedelta(days=1)
     return tomorrow.strftime('%Y-%m-%d')
+
+
+def get_next_date(date: str) -> str:
+    return shift_date(date, 1)
+
+
+def shift_date(date: str, days: int) -> str:
+    day = datetime.strptime(date, '%Y-%m-%d') + timedelta(days=days)
+    return day.strftime('%Y-%m-%d')
+
+
+def get_week_start(date: str) -> str:
+    day = datetime.strptime(date, '%Y-%m-%d')
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
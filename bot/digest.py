@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+from bot.api.cache import TimetableCache
+from bot.localizer import localize
+from bot.render import RenderCache, format_fetched_at
+from bot.scheduler import ScheduledJob
+from bot.sender import OutboundSender
+from bot.storage.session import SessionStore
+
+logger = logging.getLogger(__name__)
+
+EVERY_MINUTE = list(range(24 * 60))
+
+
+class DigestScheduler(ScheduledJob):
+    name = "digest"
+    
+    def __init__(self, cache: TimetableCache, render_cache: RenderCache, sessions: SessionStore, sender: OutboundSender,
+                 concurrency: int = 5, schedule: Optional[List[int]] = None):
+        super().__init__(EVERY_MINUTE if schedule is None else schedule)
+        self.cache = cache
+        self.render_cache = render_cache
+        self.sessions = sessions
+        self.sender = sender
+        self.concurrency = concurrency
+        self._runs: Set[asyncio.Task] = set()
+    
+    async def stop(self) -> None:
+        await super().stop()
+        for task in self._runs:
+            task.cancel()
+        await asyncio.gather(*self._runs, return_exceptions=True)
+    
+    async def run(self, scheduled: datetime) -> None:
+        # Рассылка может идти дольше минуты, поэтому не задерживаем следующий запуск
+        digest_time = scheduled.strftime('%H:%M')
+        task = asyncio.create_task(self.send_digest(digest_time))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+    
+    async def send_digest(self, digest_time: str) -> None:
+        started = time.monotonic()
+        subscribers = await self.sessions.find_digest_subscribers(digest_time)
+        if not subscribers:
+            return
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def send_group(storage_value: str, user_ids: List[str]) -> int:
+            async with semaphore:
+                entry = await self.cache.get_entry(storage_value)
+            if not entry.ok:
+                return 0
+            
+            text, parse_mode = self.render_cache.render(storage_value, entry, "day")
+            if not text.strip():
+                return 0
+            if self.cache.is_outdated(entry):
+                text += "\n\n" + localize("TimetableStaleNotice", {"Time": format_fetched_at(entry.fetched_at)})
+            
+            for user_id in user_ids:
+                self.sender.enqueue(int(user_id), text, parse_mode)
+            return len(user_ids)
+        
+        results = await asyncio.gather(
+            *(send_group(storage_value, user_ids) for storage_value, user_ids in subscribers.items()),
+            return_exceptions=True,
+        )
+        queued = sum(result for result in results if isinstance(result, int))
+        logger.info(
+            f"Рассылка {digest_time}: {len(subscribers)} расписаний, {queued} сообщений в очереди, "
+            f"{time.monotonic() - started:.1f} с"
+        )
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from bot.metrics import trace_update
+
+UNBOUNDED = 2 ** 31 - 1
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates: int, trace_log: bool = False):
+        # Общий лимит соблюдается внутри do_process_update, чтобы обновления,
+        # ждущие своей очереди у того же пользователя, не занимали слоты
+        super().__init__(UNBOUNDED)
+        self.limit = max_concurrent_updates
+        self.trace_log = trace_log
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._pending: Dict[Any, int] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.processed = 0
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "active_users": len(self._locks),
+            "limit": self.limit,
+        }
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+    
+    @staticmethod
+    def _user_key(update: object) -> Optional[int]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._user_key(update)
+        self.queued += 1
+        if key is None:
+            await self._run(update, key, coroutine)
+            return
+        
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(update, key, coroutine)
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+    
+    async def _run(self, update: object, key: Optional[int], coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self.queued -= 1
+            self.in_flight += 1
+            update_id = update.update_id if isinstance(update, Update) else None
+            try:
+                with trace_update(update_id, key, log=self.trace_log):
+                    await coroutine
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
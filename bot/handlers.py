@@ -1,16 +1,29 @@
+import asyncio
 import logging
-from typing import Optional
-from collections import defaultdict
-import re
-from pymongo import MongoClient, UpdateOne
-from telegram import Update
+import os
+import time
+from typing import Optional, Tuple
+from telegram import Bot, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
-from bot.api.timetable import TimetableAPI
-from bot.utils import validate_email
+from bot.api.timetable import TimetableAPI, UNIVERSITY_URLS
+from bot.api.breaker import CircuitBreaker
+from bot.api.cache import TimetableCache
+from bot.api.snapshot import TimetableSnapshot
+from bot.storage.session import Session, SessionStore
+from bot.storage.cache import CachedSessionStore
+from bot.storage.mongo import MongoSessionStore
+from bot.storage.shared import MemorySharedCache, MongoSharedCache, SharedCache
+from bot.utils import validate_email, normalize_time
 from bot.localizer import localize
-from bot.menu import get_main_menu, get_login_menu
+from bot.menu import get_main_menu, get_login_menu, get_navigation_menu, parse_navigation
 from bot.config import Config
+from bot.render import RenderCache, format_fetched_at, format_title
 from bot.constants import get_current_date, get_tomorrow_date
+from bot.metrics import stage
+from bot.login import LoginJob, LoginQueue
+from bot.ics import CalendarFeed
+from bot.sender import MESSAGE_LIMIT, OutboundSender, split_message, visible_length
 
 logger = logging.getLogger(__name__)
 
@@ -19,64 +32,161 @@ LOGIN_MENU = get_login_menu()
 
 
 class Handlers:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, sessions: Optional[SessionStore] = None, api: Optional[TimetableAPI] = None,
+                 shared_cache: Optional[SharedCache] = None, login_api: Optional[TimetableAPI] = None,
+                 bot: Optional[Bot] = None, shard: Optional[int] = None):
+        self.sessions = CachedSessionStore(
+            sessions or MongoSessionStore(
+                config.mongo_uri, config.mongo_db, config.mongo_collection, login_ttl=config.login_state_ttl,
+            ),
+            max_size=config.session_cache_size,
+            ttl=config.session_cache_ttl,
+        )
+        self.api = api or TimetableAPI(
+            connect_timeout=config.upstream_connect_timeout,
+            read_timeout=config.upstream_read_timeout,
+            max_connections=config.upstream_max_connections,
+            breakers={
+                university_type: CircuitBreaker(
+                    failure_threshold=config.breaker_failure_threshold / 100,
+                    window=config.breaker_window,
+                    min_requests=config.breaker_min_requests,
+                    open_seconds=config.breaker_open_seconds,
+                )
+                for university_type in UNIVERSITY_URLS
+            },
+        )
+        # Отдельный пул соединений для входа: запросы расписания не ждут в очереди за авторизациями
+        self.login_api = login_api or (api if api is not None else TimetableAPI(
+            connect_timeout=config.upstream_connect_timeout,
+            read_timeout=config.upstream_read_timeout,
+            max_connections=config.login_university_concurrency,
+            breakers=self.api.breakers,
+        ))
+        self.login_queue = LoginQueue(
+            self._process_login,
+            workers=config.login_workers,
+            max_pending=config.login_queue_size,
+            per_university=config.login_university_concurrency,
+            drop=self._complete_login,
+        )
+        self.login_check_timeout = config.login_check_timeout
+        snapshot_path = config.snapshot_path
+        if snapshot_path and shard is not None:
+            # У каждого рабочего процесса свой файл: SQLite не терпит нескольких писателей и одновременного сжатия
+            root, ext = os.path.splitext(snapshot_path)
+            snapshot_path = f"{root}.{shard}{ext}"
+        self.snapshot = TimetableSnapshot(
+            snapshot_path,
+            retention=config.snapshot_retention_hours * 3600,
+            flush_interval=config.snapshot_flush_interval,
+            compact_interval=config.snapshot_compact_interval * 3600,
+        ) if snapshot_path else None
+        if shared_cache is None and config.shared_cache == "mongo":
+            shared_cache = MongoSharedCache(config.mongo_uri, config.mongo_db, config.shared_cache_collection)
+        elif shared_cache is None and config.shared_cache == "memory":
+            shared_cache = MemorySharedCache()
+        self.shared_cache = shared_cache
+        self.timetable_cache = TimetableCache(
+            self.api,
+            ttl=config.timetable_cache_ttl,
+            max_size=config.timetable_cache_size,
+            stale_grace=config.timetable_stale_grace,
+            window_weeks=config.timetable_window_weeks,
+            snapshot=self.snapshot,
+            shared=self.shared_cache,
+        )
+        self.render_cache = RenderCache(max_size=config.timetable_cache_size)
+        self.calendar: Optional[CalendarFeed] = None
+        if config.calendar_secret:
+            # Календарь читает сессию из хранилища: запрос может прийти на другой процесс, чей кэш не знает о выходе
+            self.calendar = CalendarFeed(
+                self.timetable_cache,
+                self.sessions.backend,
+                config.calendar_secret,
+                f"{config.calendar_url.rstrip('/')}/{config.calendar_path}",
+                weeks=config.calendar_weeks,
+                max_weeks=config.calendar_max_weeks,
+                refresh_interval=config.calendar_refresh,
+                max_size=config.timetable_cache_size,
+            )
+        self.sender = OutboundSender(
+            bot,
+            # Лимит Telegram общий для бота, поэтому делится между процессами
+            global_rate=config.send_rate / config.workers,
+            bulk_rate=config.broadcast_rate,
+            chat_rate=config.send_chat_rate,
+            chat_burst=config.send_chat_burst,
+            workers=config.send_workers,
+        )
+        self._warm_up: Optional[asyncio.Task] = None
+    
+    async def initialize(self) -> None:
+        await self.sessions.initialize()
+        self.sender.start()
+        self.login_queue.start()
+        if self.shared_cache is not None:
+            await self.shared_cache.initialize()
+        if self.snapshot is not None:
+            try:
+                await self.snapshot.open()
+            except Exception as e:
+                logger.error(f"Не удалось открыть снимок расписаний {self.snapshot.path}: {e}")
+                return
+            self._warm_up = asyncio.create_task(self._warm_up_cache())
+    
+    async def _warm_up_cache(self) -> None:
+        started = time.monotonic()
         try:
-            self.client = MongoClient(config.mongo_uri)
-            self.client.admin.command("ping")
-            self.collection = self.client[config.mongo_db][config.mongo_collection]
-        except ImportError:
-            raise ImportError("Для использования MongoDB установите: pip install pymongo")
+            restored = await self.timetable_cache.warm_up()
         except Exception as e:
-            raise ConnectionError(f"Не удалось подключиться к MongoDB: {e}")
-        
-        self.api = TimetableAPI()
+            logger.error(f"Ошибка загрузки снимка расписаний: {e}", exc_info=True)
+            return
+        logger.info(f"Из снимка загружено расписаний: {restored} за {time.monotonic() - started:.2f} с")
+        try:
+            await self.snapshot.compact()
+        except Exception as e:
+            logger.error(f"Ошибка сжатия снимка расписаний: {e}")
+    
+    async def close(self) -> None:
+        await self.login_queue.stop()
+        await self.sender.stop()
+        if self._warm_up is not None:
+            self._warm_up.cancel()
+            await asyncio.gather(self._warm_up, return_exceptions=True)
+        await self.timetable_cache.close()
+        if self.snapshot is not None:
+            await self.snapshot.close()
+        await self.api.close()
+        if self.login_api is not self.api:
+            await self.login_api.close()
+        if self.shared_cache is not None:
+            await self.shared_cache.close()
+        await self.sessions.close()
     
     @staticmethod
     def _get_user_id(user) -> str:
         return str(user.id)
     
-    def _get(self, key: str) -> Optional[str]:
-        doc = self.collection.find_one({"_id": key})
-        return doc.get("value") if doc else None
-    
-    def _set(self, key: str, value: str) -> None:
-        self.collection.update_one(
-            {"_id": key},
-            {"$set": {"value": value}},
-            upsert=True,
-        )
-    
-    def _set_many(self, data: dict[str, str]) -> None:
-        operations = [
-            UpdateOne({"_id": key}, {"$set": {"value": value}}, upsert=True)
-            for key, value in data.items()
-        ]
-        if operations:
-            self.collection.bulk_write(operations)
-    
-    def _delete(self, key: str) -> None:
-        self.collection.delete_one({"_id": key})
-    
-    def _delete_many(self, keys: list[str]) -> None:
-        if keys:
-            self.collection.delete_many({"_id": {"$in": keys}})
-    
     async def start_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         text = localize("StartHandler", {"BtnLogin": "🔑 Авторизация"})
-        await update.message.reply_text(text, reply_markup=LOGIN_MENU)
+        await self.sender.reply(update.message, text, reply_markup=LOGIN_MENU)
     
-    def _init_login_state(self, user_id: str, university: str = "T"):
-        self._set_many({
-            user_id: university,
-            f"{user_id}:login_state": "waiting_login",
-            f"{user_id}:login_university": university
-        })
+    async def _init_login_state(self, user_id: str, university: str = "T"):
+        await self.sessions.update(
+            user_id,
+            storage_value=None,
+            login_state="waiting_login",
+            login_username=None,
+            login_university=university,
+            login_deadline=None,
+        )
     
     async def login_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
-        self._init_login_state(self._get_user_id(user))
+        await self._init_login_state(self._get_user_id(user))
         text = localize("LoginHandler", {})
-        await update.message.reply_text(text)
+        await self.sender.reply(update.message, text)
     
     async def login_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await self.login_handler(update, context)
@@ -85,12 +195,13 @@ class Handlers:
         user = update.effective_user
         user_id = self._get_user_id(user)
         
-        if not self._get(user_id):
-            await update.message.reply_text(localize("LogoutNotAuthError", {}))
+        session = await self.sessions.get(user_id)
+        if not session.storage_value:
+            await self.sender.reply(update.message, localize("LogoutNotAuthError", {}))
             return
         
-        self._delete(user_id)
-        await update.message.reply_text(localize("LogoutCompleteMessage", {}), reply_markup=LOGIN_MENU)
+        await self.sessions.delete(user_id)
+        await self.sender.reply(update.message, localize("LogoutCompleteMessage", {}), reply_markup=LOGIN_MENU)
     
     async def help_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         text = localize("HelpHandler", {
@@ -98,179 +209,231 @@ class Handlers:
             "BtnTomorrow": "📖 Завтра",
             "BtnWeek": "📖 Неделя"
         })
-        await update.message.reply_text(text)
+        await self.sender.reply(update.message, text)
     
     async def today_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await self._send_timetable(update, "today")
+        await self._send_timetable(update, "day", get_current_date())
     
     async def tomorrow_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await self._send_timetable(update, "tomorrow")
+        await self._send_timetable(update, "day", get_tomorrow_date())
     
     async def week_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await self._send_timetable(update, "week")
+        await self._send_timetable(update, "week", get_current_date())
     
-    def _cleanup_login_state(self, user_id: str):
-        self._delete_many([
-            f"{user_id}:login_state",
-            f"{user_id}:login_username",
-            f"{user_id}:login_university"
-        ])
+    async def navigation_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        navigation = parse_navigation(query.data)
+        if navigation is None:
+            await query.answer()
+            return
+        
+        user_id = self._get_user_id(update.effective_user)
+        with stage("session"):
+            storage_value = (await self.sessions.get(user_id)).storage_value
+        if not storage_value:
+            await query.answer(localize("TimetableLoginFirstError", {}), show_alert=True)
+            return
+        
+        try:
+            text, parse_mode, reply_markup = await self._build_timetable(storage_value, *navigation)
+            if visible_length(text, parse_mode) > MESSAGE_LIMIT:
+                # Листание правит одно сообщение: неделя показывается с начала, остальные дни — кнопкой «День»
+                notice = "\n\n" + localize("TimetableWeekTruncated", {})
+                text = split_message(text, MESSAGE_LIMIT - visible_length(notice), parse_mode)[0] + notice
+            with stage("reply"):
+                await self.sender.edit(query.message, text, parse_mode=parse_mode, reply_markup=reply_markup)
+            await query.answer()
+        except BadRequest as e:
+            # Повторное нажатие на ту же кнопку: сообщение не изменилось
+            logger.debug(f"Сообщение не изменено для пользователя {user_id}: {e}")
+            await query.answer()
+        except Exception as e:
+            logger.error(f"Ошибка навигации по расписанию для пользователя {user_id}: {e}", exc_info=True)
+            await query.answer(localize("TryLaterError", {}), show_alert=True)
+    
+    async def digest_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = self._get_user_id(update.effective_user)
+        session = await self.sessions.get(user_id)
+        
+        if not session.storage_value:
+            await self.sender.reply(update.message, localize("TimetableLoginFirstError", {}))
+            return
+        
+        args = context.args or []
+        if not args:
+            if session.digest_time:
+                await self.sender.reply(update.message, localize("DigestStatus", {"Time": session.digest_time}))
+            else:
+                await self.sender.reply(update.message, localize("DigestUsage", {}))
+            return
+        
+        if args[0].lower() in ("off", "выкл", "нет"):
+            await self.sessions.update(user_id, digest_time=None)
+            await self.sender.reply(update.message, localize("DigestDisabled", {}))
+            return
+        
+        digest_time = normalize_time(args[0])
+        if digest_time is None:
+            await self.sender.reply(update.message, localize("DigestUsage", {}))
+            return
+        
+        await self.sessions.update(user_id, digest_time=digest_time)
+        await self.sender.reply(update.message, localize("DigestEnabled", {"Time": digest_time}))
+    
+    async def calendar_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if self.calendar is None:
+            await self.sender.reply(update.message, localize("CalendarDisabled", {}))
+            return
+        
+        user_id = self._get_user_id(update.effective_user)
+        session = await self.sessions.get(user_id)
+        if not session.storage_value:
+            await self.sender.reply(update.message, localize("TimetableLoginFirstError", {}))
+            return
+        
+        await self.sender.reply(update.message, localize("CalendarLink", {"Url": self.calendar.url(user_id)}))
+    
+    async def _finish_login(self, user_id: str, storage_value: Optional[str] = None):
+        await self.sessions.update(
+            user_id,
+            storage_value=storage_value,
+            login_state=None,
+            login_username=None,
+            login_university=None,
+            login_deadline=None,
+        )
+    
+    async def _complete_login(self, job: LoginJob, storage_value: Optional[str] = None) -> bool:
+        # Итог пишется только для той проверки, что ставила задача: пользователь мог уже начать вход заново или выйти
+        session = await self.sessions.get(job.user_id)
+        if session.login_state != "checking" or session.login_deadline != job.deadline:
+            return False
+        await self._finish_login(job.user_id, storage_value)
+        return True
+    
+    @staticmethod
+    def _login_expired(session: Session) -> bool:
+        try:
+            return time.time() > float(session.login_deadline)
+        except (TypeError, ValueError):
+            return True
     
     async def text_message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         user_id = self._get_user_id(user)
         text = update.message.text.strip()
         
-        login_state = self._get(f"{user_id}:login_state")
+        with stage("session"):
+            session = await self.sessions.get(user_id)
         
-        if login_state == "waiting_login":
-            self._set_many({
-                f"{user_id}:login_username": text,
-                f"{user_id}:login_state": "waiting_password"
-            })
-            await update.message.reply_text(localize("LoginEnterPassword", {}))
-            
-        elif login_state == "waiting_password":
-            username = self._get(f"{user_id}:login_username")
-            user_university = self._get(f"{user_id}:login_university")
+        if session.login_state == "waiting_login":
+            await self.sessions.update(user_id, login_username=text, login_state="waiting_password")
+            await self.sender.reply(update.message, localize("LoginEnterPassword", {}))
+        
+        elif session.login_state == "waiting_password":
+            username = session.login_username
+            user_university = session.login_university
             
             if not username or not user_university:
-                await update.message.reply_text(localize("TryLaterError", {}))
+                await self._finish_login(user_id)
+                await self.sender.reply(update.message, localize("TryLaterError", {}))
                 return
             
-            self._cleanup_login_state(user_id)
-            
+            # Проверка логина идёт в фоновой очереди, чтобы не задерживать остальные обновления
+            # Срок проверки хранится в сессии: если задача потеряется, следующее сообщение сбросит вход
+            deadline = str(int(time.time()) + self.login_check_timeout)
+            await self.sessions.update(user_id, login_state="checking", login_username=None, login_deadline=deadline)
+            checking = await self.sender.reply(update.message, localize("LoginChecking", {}))
             try:
-                token_info = self.api.auth_user(user_university, username, text)
-                
-                if token_info.get('state') == -1:
-                    await update.message.reply_text(localize("LoginWrongLoginOrPasswordError", {}))
-                    return
-                
-                access_token = token_info['data']['accessToken']
-                api_user_id = str(token_info['data']['data']['id'])
-                
-                if not validate_email(username):
-                    teacher_id = self.api.get_teacher_id(user_university, access_token, api_user_id)
-                    storage_value = f"{user_university}{teacher_id}T"
-                else:
-                    group_id = self.api.get_student_group_id(user_university, access_token, api_user_id)
-                    storage_value = f"{user_university}{group_id}"
-                
-                self._set(user_id, storage_value)
-                
-                await update.message.reply_text(
-                    localize("LoginCompleteMessage", {"BtnLogout": "🚪 Выход"}),
-                    reply_markup=MAIN_MENU
-                )
-                
-            except Exception as e:
-                logger.error(f"Ошибка авторизации: {e}")
-                await update.message.reply_text(localize("TryLaterError", {}))
-    
-    async def _send_timetable(self, update: Update, period: str):
-        user = update.effective_user
-        user_id = self._get_user_id(user)
-        storage_value = self._get(user_id)
+                self.login_queue.submit(LoginJob(user_id, user_university, username, text, checking, deadline))
+            except asyncio.QueueFull:
+                await self._finish_login(user_id)
+                await self.sender.edit(checking, localize("LoginQueueFull", {}))
         
-        if not storage_value:
-            await update.message.reply_text(localize("TimetableLoginFirstError", {}))
-            return
+        elif session.login_state == "checking":
+            if self._login_expired(session):
+                await self._finish_login(user_id)
+                await self.sender.reply(update.message, localize("LoginCheckExpired", {"BtnLogin": "🔑 Авторизация"}),
+                                        reply_markup=LOGIN_MENU)
+                return
+            await self.sender.reply(update.message, localize("LoginChecking", {}))
+    
+    async def _process_login(self, job: LoginJob) -> str:
+        if time.time() > float(job.deadline):
+            await self._complete_login(job)
+            await self.sender.edit(job.message, localize("LoginCheckExpired", {"BtnLogin": "🔑 Авторизация"}))
+            return "expired"
         
+        storage_value = None
         try:
-            timetable = self.api.get_timetable(storage_value)
-            text, parse_mode = self._format_timetable(timetable, storage_value, period)
+            token_info = await self.login_api.auth_user(job.university, job.username, job.password)
+            
+            if token_info.get('state') == -1:
+                await self.sender.edit(job.message, localize("LoginWrongLoginOrPasswordError", {}))
+                return "wrong"
             
-            if not text or not text.strip():
-                await update.message.reply_text(localize("TimetableEmpty", {}))
+            access_token = token_info['data']['accessToken']
+            api_user_id = str(token_info['data']['data']['id'])
+            
+            if not validate_email(job.username):
+                teacher_id = await self.login_api.get_teacher_id(job.university, access_token, api_user_id)
+                storage_value = f"{job.university}{teacher_id}T"
             else:
-                await update.message.reply_text(text, parse_mode=parse_mode)
-        except Exception as e:
-            logger.error(f"Ошибка получения расписания для пользователя {user_id}: {e}", exc_info=True)
-            await update.message.reply_text(localize("TryLaterError", {}))
-    
-    def _format_timetable(self, timetable: dict, storage_value: str, period: str):
-        if not timetable or 'data' not in timetable or 'rasp' not in timetable['data']:
-            return "", None
+                group_id = await self.login_api.get_student_group_id(job.university, access_token, api_user_id)
+                storage_value = f"{job.university}{group_id}"
         
-        items = timetable['data']['rasp']
-        is_teacher = storage_value.endswith('T')
+        except Exception as e:
+            logger.error(f"Ошибка авторизации: {e}")
+            await self.sender.edit(job.message, localize("TryLaterError", {}))
+            return "error"
         
-        if period == "today":
-            current_date = get_current_date()
-            filtered_items = [item for item in items if item.get('дата', '').startswith(current_date)]
-        elif period == "tomorrow":
-            tomorrow_date = get_tomorrow_date()
-            filtered_items = [item for item in items if item.get('дата', '').startswith(tomorrow_date)]
-        else:
-            filtered_items = items
+        finally:
+            completed = await self._complete_login(job, storage_value)
         
-        if not filtered_items:
-            return "", None
+        if not completed:
+            logger.info(f"Результат входа пользователя {job.user_id} не сохранён: вход уже начат заново или сброшен")
+            return "stale"
         
-        lines = []
-        if period == "week":
-            by_day = defaultdict(list)
-            for item in filtered_items:
-                day_num = item.get('деньНедели', 0)
-                if 1 <= day_num <= 7:
-                    by_day[day_num].append(item)
-            
-            for day_num in sorted(by_day.keys()):
-                day_items = by_day[day_num]
-                if day_items:
-                    day_name = day_items[0].get('день_недели', '')
-                    if day_name.startswith('📅 '):
-                        day_name = day_name[2:]
-                    day_name = re.sub(r'\s+\d+$', '', day_name).strip()
-                    lines.append(f"\n<b>{day_name}</b>\n")
-                    for idx, item in enumerate(day_items):
-                        lines.append(self._format_item(item, is_teacher, idx + 1))
-                        if idx < len(day_items) - 1:
-                            lines.append("\n\n")
-        else:
-            period_titles = {"today": "Сегодня", "tomorrow": "Завтра"}
-            if period in period_titles:
-                lines.append(f"<b>{period_titles[period]}</b>")
-            
-            for idx, item in enumerate(filtered_items):
-                lines.append(self._format_item(item, is_teacher, idx + 1))
-                if idx < len(filtered_items) - 1:
-                    lines.append("\n\n")
-        
-        return "\n".join(lines), "HTML"
-    
-    def _get_lesson_type_emoji(self, discipline: str) -> str:
-        discipline_lower = discipline.lower()
-        if discipline_lower.startswith('лек'):
-            return "🟢"
-        elif discipline_lower.startswith('лаб'):
-            return "🔵"
-        elif discipline_lower.startswith('пр'):
-            return "🟠"
-        return "⚪"
+        await self.sender.edit(job.message, localize("LoginSucceeded", {}))
+        await self.sender.reply(
+            job.message,
+            localize("LoginCompleteMessage", {"BtnLogout": "🚪 Выход"}),
+            reply_markup=MAIN_MENU
+        )
+        return "ok"
     
-    def _format_item(self, item: dict, is_teacher: bool, number: int = 0) -> str:
-        discipline = item.get('дисциплина', '')
-        
-        if is_teacher:
-            teacher_part = f"👤 <b>{item.get('группа', '')}</b>"
-        else:
-            teacher_part = f"👤 <b>{item.get('преподаватель', '')}</b>"
-        
-        start = item.get('начало', '')
-        end = item.get('конец', '')
-        audience = item.get('аудитория', '')
-
-        number_prefix = f"<b>{number}.</b> " if number > 0 else ""
-        type_emoji = self._get_lesson_type_emoji(discipline)
+    async def _send_timetable(self, update: Update, period: str, date: str):
+        user = update.effective_user
+        user_id = self._get_user_id(user)
+        with stage("session"):
+            storage_value = (await self.sessions.get(user_id)).storage_value
         
-        line1 = f"{number_prefix}{type_emoji} <b>{discipline}</b>"
-        time_part = f"{start}–{end}" if start and end else (start or end)
-        line2 = f"{teacher_part}  🕒 <code>{time_part}</code>"
+        if not storage_value:
+            await self.sender.reply(update.message, localize("TimetableLoginFirstError", {}))
+            return
         
-        lines = [line1, line2]
-        if audience:
-            lines.append(f"📍 <i>{audience}</i>")
+        try:
+            text, parse_mode, reply_markup = await self._build_timetable(storage_value, period, date)
+            with stage("reply"):
+                await self.sender.reply(update.message, text, parse_mode=parse_mode, reply_markup=reply_markup)
+        except Exception as e:
+            logger.error(f"Ошибка получения расписания для пользователя {user_id}: {e}", exc_info=True)
+            await self.sender.reply(update.message, localize("TryLaterError", {}))
+    
+    async def _build_timetable(self, storage_value: str, period: str,
+                               date: str) -> Tuple[str, Optional[str], InlineKeyboardMarkup]:
+        reply_markup = get_navigation_menu(period, date)
+        with stage("timetable"):
+            entry = await self.timetable_cache.get_entry(storage_value, date)
+        self.timetable_cache.prefetch_window(storage_value, date)
+        if not entry.ok:
+            return localize("TryLaterError", {}), None, reply_markup
         
-        return "\n".join(lines)
+        with stage("render"):
+            text, parse_mode = self.render_cache.render(storage_value, entry, period, date)
+        if not text or not text.strip():
+            empty = localize("TimetableWeekEmpty" if period == "week" else "TimetableEmpty", {})
+            text, parse_mode = f"<b>{format_title(period, date, get_current_date())}</b>\n{empty}", "HTML"
+        if self.timetable_cache.is_outdated(entry):
+            text += "\n\n" + localize("TimetableStaleNotice", {"Time": format_fetched_at(entry.fetched_at)})
+        return text, parse_mode, reply_markup
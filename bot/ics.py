@@ -0,0 +1,237 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from collections import Counter, OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from bot.api.cache import TimetableCache
+from bot.api.models import WeekTimetable
+from bot.constants import get_current_date, get_week_start, shift_date
+from bot.storage.session import SessionStore
+from bot.web import Request, Response, StreamingResponse
+
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+
+CALENDAR_HEADER = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//DGTY Timetable Bot//RU",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Расписание ДГТУ",
+    "X-WR-TIMEZONE:Europe/Moscow",
+    "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+    "BEGIN:VTIMEZONE",
+    "TZID:Europe/Moscow",
+    "BEGIN:STANDARD",
+    "DTSTART:19700101T000000",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0300",
+    "TZNAME:MSK",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]).encode() + b"\r\n"
+CALENDAR_FOOTER = b"END:VCALENDAR\r\n"
+
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def fold_line(line: str) -> str:
+    # RFC 5545: строки длиннее 75 октетов переносятся, продолжение начинается с пробела
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts = []
+    while raw:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(raw))
+        while cut < len(raw) and raw[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode())
+        raw = raw[cut:]
+    return "\r\n ".join(parts)
+
+
+def _ics_time(date: str, clock: str) -> str:
+    hours, _, minutes = clock.partition(":")
+    if len(date) != 10 or not hours:
+        raise ValueError(clock)
+    return f"{date.replace('-', '')}T{int(hours):02d}{int(minutes or 0):02d}00"
+
+
+def render_week(storage_value: str, week: WeekTimetable, stamp: float) -> bytes:
+    is_teacher = storage_value.endswith('T')
+    dtstamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(stamp))
+    lines: List[str] = []
+    for lesson in week.lessons:
+        try:
+            start = _ics_time(lesson.date, lesson.start)
+            end = _ics_time(lesson.date, lesson.end or lesson.start)
+        except ValueError:
+            continue
+        uid_source = "|".join((storage_value, lesson.date, lesson.start, lesson.discipline, lesson.group))
+        counterpart = lesson.group if is_teacher else lesson.teacher
+        lines.append("BEGIN:VEVENT")
+        lines.append(f"UID:{hashlib.sha1(uid_source.encode()).hexdigest()}@dgty-bot")
+        lines.append(f"DTSTAMP:{dtstamp}")
+        lines.append(f"DTSTART;TZID=Europe/Moscow:{start}")
+        lines.append(f"DTEND;TZID=Europe/Moscow:{end}")
+        lines.append(fold_line(f"SUMMARY:{escape_text(lesson.discipline)}"))
+        if lesson.room:
+            lines.append(fold_line(f"LOCATION:{escape_text(lesson.room)}"))
+        if counterpart:
+            lines.append(fold_line(f"DESCRIPTION:{escape_text(counterpart)}"))
+        lines.append("END:VEVENT")
+    return ("\r\n".join(lines) + "\r\n").encode() if lines else b""
+
+
+class FeedState:
+    __slots__ = ("etag", "last_modified", "hashes", "weeks", "checked_at")
+    
+    def __init__(self, etag: str, last_modified: float, hashes: Tuple[str, ...],
+                 weeks: List[Tuple[str, str, WeekTimetable]], checked_at: float):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.hashes = hashes
+        self.weeks = weeks
+        self.checked_at = checked_at
+
+
+class CalendarFeed:
+    def __init__(self, cache: TimetableCache, sessions: SessionStore, secret: str, base_url: str, weeks: int = 4,
+                 max_weeks: int = 12, refresh_interval: float = 900, max_size: int = 5000):
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.sessions = sessions
+        self.secret = secret.encode()
+        self.weeks = weeks
+        self.max_weeks = max_weeks
+        self.refresh_interval = refresh_interval
+        self.max_size = max_size
+        self.responses: Counter = Counter()
+        self.rendered = 0
+        self._states: "OrderedDict[Tuple[str, str, int], FeedState]" = OrderedDict()
+        self._rendered: "OrderedDict[Tuple[str, str], Tuple[str, bytes]]" = OrderedDict()
+    
+    def sign(self, user_id: str) -> str:
+        payload = base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+        return f"{payload}.{self._signature(payload)}"
+    
+    def verify(self, token: str) -> Optional[str]:
+        payload, _, signature = token.partition(".")
+        if not payload or not hmac.compare_digest(signature, self._signature(payload)):
+            return None
+        try:
+            return base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode()
+        except ValueError:
+            return None
+    
+    def _signature(self, payload: str) -> str:
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()[:32]
+    
+    def url(self, user_id: str) -> str:
+        return f"{self.base_url}/{self.sign(user_id)}.ics"
+    
+    async def handle(self, request: Request) -> Response:
+        response = await self._respond(request)
+        self.responses[str(response.status)] += 1
+        return response
+    
+    async def _respond(self, request: Request) -> Response:
+        token = request.path.rsplit("/", 1)[-1]
+        if not token.endswith(".ics"):
+            return Response(b"not found", status=404)
+        user_id = self.verify(token[:-4])
+        if user_id is None:
+            return Response(b"not found", status=404)
+        
+        storage_value = (await self.sessions.get(user_id)).storage_value
+        if not storage_value:
+            return Response(b"not found", status=404)
+        
+        try:
+            weeks = min(max(int(request.query.get("weeks", self.weeks)), 1), self.max_weeks)
+        except ValueError:
+            return Response(b"bad request", status=400)
+        
+        state = await self._state(storage_value, weeks)
+        if state is None:
+            return Response(b"upstream unavailable", status=503, headers={"retry-after": "300"})
+        
+        headers = {
+            "etag": state.etag,
+            "last-modified": formatdate(state.last_modified, usegmt=True),
+            "cache-control": f"private, max-age={int(self.refresh_interval)}",
+        }
+        if self._not_modified(request, state):
+            return Response(status=304, headers=headers)
+        return StreamingResponse(self._stream(storage_value, state), headers=headers, content_type=CONTENT_TYPE)
+    
+    @staticmethod
+    def _not_modified(request: Request, state: FeedState) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or state.etag in tags or f"W/{state.etag}" in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(state.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+    
+    async def _state(self, storage_value: str, weeks: int) -> Optional[FeedState]:
+        first_week = get_week_start(get_current_date())
+        key = (storage_value, first_week, weeks)
+        state = self._states.get(key)
+        now = time.time()
+        # Частые опросы календаря в пределах интервала обслуживаются без обращения к кэшу и API
+        if state is not None and now - state.checked_at < self.refresh_interval:
+            self._states.move_to_end(key)
+            return state
+        
+        dates = [shift_date(first_week, offset * 7) for offset in range(weeks)]
+        entries = await asyncio.gather(*(self.cache.get_entry(storage_value, date) for date in dates))
+        if not all(entry.ok for entry in entries):
+            return state
+        
+        hashes = tuple(entry.payload_hash for entry in entries)
+        weeks_data = [(date, entry.payload_hash, entry.week) for date, entry in zip(dates, entries)]
+        if state is not None and state.hashes == hashes:
+            state.weeks = weeks_data
+            state.checked_at = now
+        else:
+            etag = '"' + hashlib.sha1("|".join((storage_value, *hashes)).encode()).hexdigest() + '"'
+            state = FeedState(etag, now, hashes, weeks_data, now)
+        
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_size:
+            self._states.popitem(last=False)
+        return state
+    
+    async def _stream(self, storage_value: str, state: FeedState) -> AsyncIterator[bytes]:
+        yield CALENDAR_HEADER
+        for week_start, payload_hash, week in state.weeks:
+            yield self._render_week(storage_value, week_start, payload_hash, week, state.last_modified)
+        yield CALENDAR_FOOTER
+    
+    def _render_week(self, storage_value: str, week_start: str, payload_hash: str, week: WeekTimetable,
+                     stamp: float) -> bytes:
+        key = (storage_value, week_start)
+        cached = self._rendered.get(key)
+        if cached is not None and cached[0] == payload_hash:
+            self._rendered.move_to_end(key)
+            return cached[1]
+        
+        self.rendered += 1
+        body = render_week(storage_value, week, stamp)
+        self._rendered[key] = (payload_hash, body)
+        while len(self._rendered) > self.max_size:
+            self._rendered.popitem(last=False)
+        return body
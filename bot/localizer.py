@@ -4,14 +4,28 @@ TRANSLATIONS = {
     "StartHandler": "Здравствуйте! Это неофициальный бот который позволяет узнать расписание студентов и сотрудников ДГТУ.\nДля авторизации нажмите {BtnLogin}",
     "LoginHandler": "Пожалуйста, введите ваш логин:",
     "LoginEnterPassword": "Теперь введите ваш пароль:",
-    "HelpHandler": "Для взаимодействия с ботом используйте кнопки интерактивного меню. Они позволяют посмотреть актуальное расписание на сегодня, завтра, и на неделю.\n\nУсловные обозначения:\n\n🟢 - Лекция\n🟠 - Практика\n🔵 - По группам\n\nДля авторизации нажмите кнопку '🔑 Авторизация' и следуйте инструкциям.",
+    "HelpHandler": "Для взаимодействия с ботом используйте кнопки интерактивного меню. Они позволяют посмотреть актуальное расписание на сегодня, завтра, и на неделю.\n\nУсловные обозначения:\n\n🟢 - Лекция\n🟠 - Практика\n🔵 - По группам\n\nЧтобы получать расписание на сегодня каждое утро, отправьте /digest ЧЧ:ММ. Ссылка для подписки в календаре: /calendar.\n\nДля авторизации нажмите кнопку '🔑 Авторизация' и следуйте инструкциям.",
     "LoginWrongLoginOrPasswordError": "Введен неправильный логин или пароль",
+    "LoginChecking": "⏳ Проверяем логин и пароль…",
+    "LoginSucceeded": "✅ Вход выполнен",
+    "LoginCheckExpired": "Проверка входа не завершилась, пожалуйста начните вход заново: {BtnLogin}",
+    "LoginQueueFull": "Сейчас слишком много входов, пожалуйста попробуйте через минуту",
     "LoginCompleteMessage": "В целях безопасности вы можете удалить логин и пароль введенный выше. Для взаимодествия с ботом используйте пункты меню.",
     "LogoutNotAuthError": "Вы не авторизованы для выхода",
     "LogoutCompleteMessage": "Вы успешно вышли с аккаунта",
     "TimetableLoginFirstError": "Для начала вы должны авторизоваться",
     "TimetableEmpty": "На этот день пар нет",
+    "TimetableWeekEmpty": "На этой неделе пар нет",
     "TryLaterError": "Ошибка, пожалуйста попробуйте позже",
+    "DigestUsage": "Бот может каждый день присылать расписание на сегодня. Отправьте /digest ЧЧ:ММ (время московское), например /digest 07:30",
+    "DigestStatus": "Расписание на сегодня приходит каждый день в {Time} по Москве. Изменить время: /digest ЧЧ:ММ, отключить: /digest off",
+    "DigestEnabled": "Готово! Расписание на сегодня будет приходить каждый день в {Time} по Москве. Отключить: /digest off",
+    "DigestDisabled": "Ежедневная рассылка расписания отключена",
+    "CalendarLink": "Добавьте ссылку в Google Календарь, Apple Календарь или Outlook как календарь по URL — пары будут обновляться автоматически:\n\n{Url}\n\nНе передавайте ссылку другим: по ней видно ваше расписание.",
+    "CalendarDisabled": "Подписка на календарь сейчас недоступна",
+    "TimetableChangedTitle": "Расписание изменилось",
+    "TimetableWeekTruncated": "Неделя не поместилась в одно сообщение целиком, остальные дни можно посмотреть кнопкой «📖 День»",
+    "TimetableStaleNotice": "⚠️ Сайт университета недоступен, расписание по данным на {Time}",
 }
 
 
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from telegram import Message
+
+logger = logging.getLogger(__name__)
+
+
+class LoginJob(NamedTuple):
+    user_id: str
+    university: str
+    username: str
+    password: str
+    message: Message
+    deadline: str
+
+
+class LoginQueue:
+    def __init__(self, process: Callable[[LoginJob], Awaitable[str]], workers: int = 10, max_pending: int = 1000,
+                 per_university: int = 5, drop: Optional[Callable[[LoginJob], Awaitable[None]]] = None):
+        self.process = process
+        self.drop = drop
+        self.workers = workers
+        self.per_university = per_university
+        self.in_progress = 0
+        self.results: Counter = Counter()
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: List[asyncio.Task] = []
+    
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+    
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(), name=f"login-{idx}") for idx in range(self.workers)]
+    
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Непроверенные входы не должны остаться в состоянии проверки после перезапуска
+        jobs = []
+        while not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+            self._queue.task_done()
+        self.results["dropped"] += len(jobs)
+        if self.drop is not None and jobs:
+            results = await asyncio.gather(*(self.drop(job) for job in jobs), return_exceptions=True)
+            for job, result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Не удалось сбросить вход пользователя {job.user_id}: {result}")
+    
+    def submit(self, job: LoginJob) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.results["rejected"] += 1
+            raise
+    
+    async def join(self) -> None:
+        await self._queue.join()
+    
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                limit = self._limits.setdefault(job.university, asyncio.Semaphore(self.per_university))
+                async with limit:
+                    self.in_progress += 1
+                    try:
+                        self.results[await self.process(job)] += 1
+                    finally:
+                        self.in_progress -= 1
+            except Exception as e:
+                self.results["error"] += 1
+                logger.error(f"Ошибка обработки входа пользователя {job.user_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import logging
+from bot.config import Config
+from bot.storage.mongo import MongoSessionStore
+
+logger = logging.getLogger(__name__)
+
+
+def _format_size(size: int) -> str:
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+async def run(args: argparse.Namespace) -> None:
+    config = Config()
+    store = MongoSessionStore(config.mongo_uri, config.mongo_db, config.mongo_collection, login_ttl=config.login_state_ttl)
+    try:
+        await store.initialize()
+        if args.command == "compact":
+            result = await store.compact(batch_size=args.batch_size, dry_run=args.dry_run)
+            prefix = "Будет перенесено" if args.dry_run else "Перенесено"
+            print(f"{prefix} пользователей: {result['migrated']}, устаревших документов: {result['removed']}")
+        
+        stats = await store.stats()
+        print(f"Документов: {stats['documents']}")
+        print(f"Пользователей с расписанием: {stats['users']}")
+        print(f"Подписчиков рассылки: {stats['digest_subscribers']}")
+        print(f"Незавершённых входов: {stats['logins_in_progress']} (истекли: {stats['logins_expired']})")
+        print(f"Документов старой схемы: {stats['legacy_documents']}")
+        print(f"Данные: {_format_size(stats['data_size'])}, на диске: {_format_size(stats['storage_size'])}, "
+              f"индексы: {_format_size(stats['index_size'])}")
+        print(f"Индексы: {', '.join(stats['indexes'])}")
+    finally:
+        await store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Обслуживание коллекции сессий в MongoDB")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Показать размер коллекции и число сессий")
+    compact = subparsers.add_parser("compact", help="Перенести документы старой схемы в сессии и удалить лишние")
+    compact.add_argument("--batch-size", type=int, default=500)
+    compact.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    try:
+        asyncio.run(run(args))
+    except ValueError as e:
+        logger.error(f"Ошибка конфигурации: {e}")
+    except ConnectionError as e:
+        logger.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,12 @@
-from telegram import ReplyKeyboardMarkup
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from bot.constants import get_current_date, get_week_start, shift_date
+
+NAVIGATION_PREFIX = "tt"
+NAVIGATION_PATTERN = re.compile(rf"^{NAVIGATION_PREFIX}:(day|week):(\d{{4}}-\d{{2}}-\d{{2}})$")
 
 
 def get_main_menu() -> ReplyKeyboardMarkup:
@@ -13,3 +21,48 @@ def get_main_menu() -> ReplyKeyboardMarkup:
 def get_login_menu() -> ReplyKeyboardMarkup:
     keyboard = [["🔑 Авторизация"]]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+
+def _navigation_button(text: str, period: str, date: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text, callback_data=f"{NAVIGATION_PREFIX}:{period}:{date}")
+
+
+def get_navigation_menu(period: str, date: str) -> InlineKeyboardMarkup:
+    return _navigation_menu(period, date, get_current_date())
+
+
+@lru_cache(maxsize=1024)
+def _navigation_menu(period: str, date: str, today: str) -> InlineKeyboardMarkup:
+    if period == "week":
+        week_start = get_week_start(date)
+        day = today if get_week_start(today) == week_start else week_start
+        keyboard = [[
+            _navigation_button("« Неделя", "week", shift_date(week_start, -7)),
+            _navigation_button("📖 День", "day", day),
+            _navigation_button("Неделя »", "week", shift_date(week_start, 7)),
+        ]]
+    else:
+        keyboard = [
+            [
+                _navigation_button("« День", "day", shift_date(date, -1)),
+                _navigation_button("📅 Неделя", "week", date),
+                _navigation_button("День »", "day", shift_date(date, 1)),
+            ],
+            [
+                _navigation_button("« Неделя", "day", shift_date(date, -7)),
+                _navigation_button("Неделя »", "day", shift_date(date, 7)),
+            ],
+        ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def parse_navigation(data: Optional[str]) -> Optional[Tuple[str, str]]:
+    match = NAVIGATION_PATTERN.match(data or "")
+    if match is None:
+        return None
+    period, date = match.groups()
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return None
+    return period, date
@@ -0,0 +1,208 @@
+import bisect
+import contextvars
+import logging
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+    
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+    
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+    
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class CallbackMetric(Metric):
+    def __init__(self, name: str, documentation: str, metric_type: str, callback: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        self.callback = callback
+    
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.callback().items())
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+    
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "bot_stage_duration_seconds", "Время этапа обработки обновления", ("stage",)
+))
+UPDATE_DURATION = REGISTRY.register(Histogram(
+    "bot_update_duration_seconds", "Полное время обработки обновления"
+))
+UPDATES_TOTAL = REGISTRY.register(Counter(
+    "bot_updates_total", "Обработанные обновления", ("result",)
+))
+UPSTREAM_DURATION = REGISTRY.register(Histogram(
+    "bot_upstream_request_duration_seconds", "Время запроса к API университета", ("university", "endpoint")
+))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "bot_upstream_responses_total", "Ответы API университета по кодам", ("university", "endpoint", "status")
+))
+
+
+class UpdateTrace:
+    __slots__ = ("update_id", "user_id", "started", "stages")
+    
+    def __init__(self, update_id: Optional[int], user_id: Optional[int]):
+        self.update_id = update_id
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+    
+    def format(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        stages = " ".join(f"{name}={duration * 1000:.1f}ms" for name, duration in self.stages)
+        return f"update={self.update_id} user={self.user_id} total={total:.1f}ms {stages}".rstrip()
+
+
+_current_trace: contextvars.ContextVar[Optional[UpdateTrace]] = contextvars.ContextVar("update_trace", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_DURATION.observe(duration, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages.append((name, duration))
+
+
+@contextmanager
+def trace_update(update_id: Optional[int], user_id: Optional[int], log: bool = False) -> Iterator[UpdateTrace]:
+    trace = UpdateTrace(update_id, user_id)
+    token = _current_trace.set(trace)
+    result = "ok"
+    try:
+        yield trace
+    except BaseException:
+        result = "error"
+        raise
+    finally:
+        _current_trace.reset(token)
+        UPDATE_DURATION.observe(time.perf_counter() - trace.started)
+        UPDATES_TOTAL.inc(result=result)
+        if log:
+            logger.info(f"Трассировка: {trace.format()}")
@@ -0,0 +1,156 @@
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+from bot.api.cache import CacheEntry
+from bot.api.models import LAB, LECTURE, OTHER, PRACTICE, Lesson, WeekDiff, WeekTimetable
+from bot.localizer import localize
+from bot.constants import MOSCOW_TZ, get_current_date, get_next_date, get_week_start, shift_date
+
+Rendered = Tuple[str, Optional[str]]
+
+WEEKDAY_NAMES = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+
+LESSON_TYPE_EMOJI = {
+    LECTURE: "🟢",
+    LAB: "🔵",
+    PRACTICE: "🟠",
+    OTHER: "⚪",
+}
+
+
+def format_timetable(week: WeekTimetable, storage_value: str, period: str, current_date: str,
+                     date: Optional[str] = None) -> Rendered:
+    is_teacher = storage_value.endswith('T')
+    
+    if period == "week":
+        if not week.by_weekday:
+            return "", None
+        
+        lines = []
+        for day_num, day_lessons in week.by_weekday.items():
+            day_name = week.day_names.get(day_num) or WEEKDAY_NAMES[(day_num - 1) % 7]
+            lines.append(f"\n<b>{day_name}, {_short_date(day_lessons[0].date)}</b>\n")
+            lines.append(format_lessons(day_lessons, is_teacher))
+        return "\n".join(lines), "HTML"
+    
+    date = date or current_date
+    lessons = week.on_date(date)
+    if not lessons:
+        return "", None
+    
+    lines = [f"<b>{format_title(period, date, current_date)}</b>", format_lessons(lessons, is_teacher)]
+    return "\n".join(lines), "HTML"
+
+
+def format_title(period: str, date: str, current_date: str) -> str:
+    if period == "week":
+        week_start = get_week_start(date)
+        return f"Неделя {_short_date(week_start)}–{_short_date(shift_date(week_start, 6))}"
+    if date == current_date:
+        return "Сегодня"
+    if date == get_next_date(current_date):
+        return "Завтра"
+    weekday = datetime.strptime(date, '%Y-%m-%d').weekday()
+    return f"{WEEKDAY_NAMES[weekday]}, {_short_date(date)}"
+
+
+def _short_date(date: str) -> str:
+    return f"{date[8:10]}.{date[5:7]}"
+
+
+def format_lessons(lessons: Sequence[Lesson], is_teacher: bool) -> str:
+    return "\n\n\n\n".join(format_lesson(lesson, is_teacher, idx + 1) for idx, lesson in enumerate(lessons))
+
+
+def format_lesson(lesson: Lesson, is_teacher: bool, number: int = 0) -> str:
+    counterpart = lesson.group if is_teacher else lesson.teacher
+    teacher_part = f"👤 <b>{counterpart}</b>"
+    
+    number_prefix = f"<b>{number}.</b> " if number > 0 else ""
+    type_emoji = LESSON_TYPE_EMOJI[lesson.lesson_type]
+    
+    line1 = f"{number_prefix}{type_emoji} <b>{lesson.discipline}</b>"
+    start, end = lesson.start, lesson.end
+    time_part = f"{start}–{end}" if start and end else (start or end)
+    line2 = f"{teacher_part}  🕒 <code>{time_part}</code>"
+    
+    lines = [line1, line2]
+    if lesson.room:
+        lines.append(f"📍 <i>{lesson.room}</i>")
+    
+    return "\n".join(lines)
+
+
+def _lesson_slot(lesson: Lesson) -> str:
+    time_part = f"{lesson.start}–{lesson.end}" if lesson.start and lesson.end else (lesson.start or lesson.end)
+    slot = f"{_short_date(lesson.date)} {time_part}".strip()
+    return f"{slot}, {lesson.room}" if lesson.room else slot
+
+
+def format_changes(diff: WeekDiff, is_teacher: bool) -> str:
+    def order(lesson: Lesson):
+        return lesson.date, lesson.start
+    
+    def title(lesson: Lesson) -> str:
+        counterpart = lesson.group if is_teacher else lesson.teacher
+        return f"{LESSON_TYPE_EMOJI[lesson.lesson_type]} <b>{lesson.discipline}</b> ({counterpart})"
+    
+    lines = [f"🔔 <b>{localize('TimetableChangedTitle', {})}</b>"]
+    for old, new in sorted(diff.moved, key=lambda pair: order(pair[1])):
+        lines.append(f"🔁 {title(new)}\n<s>{_lesson_slot(old)}</s> → <code>{_lesson_slot(new)}</code>")
+    for lesson in sorted(diff.added, key=order):
+        lines.append(f"➕ {title(lesson)}\n<code>{_lesson_slot(lesson)}</code>")
+    for lesson in sorted(diff.removed, key=order):
+        lines.append(f"➖ {title(lesson)}\n<s>{_lesson_slot(lesson)}</s>")
+    return "\n\n".join(lines)
+
+
+def format_fetched_at(fetched_at: float) -> str:
+    fetched = datetime.fromtimestamp(fetched_at, MOSCOW_TZ)
+    if fetched.strftime('%Y-%m-%d') == get_current_date():
+        return fetched.strftime('%H:%M')
+    return fetched.strftime('%d.%m %H:%M')
+
+
+class RenderedTimetable:
+    __slots__ = ("payload_hash", "date", "texts")
+    
+    def __init__(self, payload_hash: str, date: str):
+        self.payload_hash = payload_hash
+        self.date = date
+        self.texts: Dict[Tuple[str, str], Rendered] = {}
+
+
+class RenderCache:
+    def __init__(self, max_size: int = 5000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._rendered: "OrderedDict[Tuple[str, str], RenderedTimetable]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._rendered)
+    
+    def render(self, storage_value: str, entry: CacheEntry, period: str, date: Optional[str] = None) -> Rendered:
+        current_date = get_current_date()
+        date = date or current_date
+        key = (storage_value, get_week_start(date))
+        rendered = self._rendered.get(key)
+        # Заголовки "Сегодня"/"Завтра" зависят от текущей даты, поэтому в полночь кэш сбрасывается
+        if rendered is None or rendered.payload_hash != entry.payload_hash or rendered.date != current_date:
+            rendered = RenderedTimetable(entry.payload_hash, current_date)
+            self._rendered[key] = rendered
+        self._rendered.move_to_end(key)
+        while len(self._rendered) > self.max_size:
+            self._rendered.popitem(last=False)
+        
+        view = (period, "" if period == "week" else date)
+        text = rendered.texts.get(view)
+        if text is not None:
+            self.hits += 1
+            return text
+        
+        self.misses += 1
+        text = format_timetable(entry.week, storage_value, period, current_date, date)
+        rendered.texts[view] = text
+        return text
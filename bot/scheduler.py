@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bot.api.cache import TimetableCache
+from bot.constants import MOSCOW_TZ
+from bot.ratelimit import TokenBucket
+from bot.storage.session import SessionStore
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value: str) -> int:
+    hours, minutes = value.strip().split(":")
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute < 24 * 60:
+        raise ValueError(f"Некорректное время: {value}")
+    return minute
+
+
+def parse_schedule(schedule: str) -> List[int]:
+    minutes = set()
+    for part in filter(None, (part.strip() for part in schedule.split(","))):
+        try:
+            if "-" in part:
+                period, _, step = part.partition("/")
+                start, end = (_parse_time(value) for value in period.split("-"))
+                minutes.update(range(start, end + 1, int(step or 60)))
+            else:
+                minutes.add(_parse_time(part))
+        except ValueError:
+            raise ValueError(f"Некорректное расписание запуска: {part}")
+    return sorted(minutes)
+
+
+class ScheduledJob(ABC):
+    name = "job"
+    
+    def __init__(self, schedule: List[int]):
+        self.schedule = schedule
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        if self.schedule and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def next_run(self, now: datetime) -> datetime:
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        current = now.hour * 60 + now.minute
+        for minute in self.schedule:
+            if minute > current:
+                return MOSCOW_TZ.localize(midnight + timedelta(minutes=minute))
+        return MOSCOW_TZ.localize(midnight + timedelta(days=1, minutes=self.schedule[0]))
+    
+    async def _loop(self) -> None:
+        previous: Optional[datetime] = None
+        while True:
+            now = datetime.now(MOSCOW_TZ)
+            # Таймер может сработать чуть раньше границы минуты: следующий запуск считаем от уже выполненного
+            scheduled = self.next_run(now if previous is None else max(now, previous))
+            await asyncio.sleep(max(0.0, (scheduled - now).total_seconds()))
+            previous = scheduled
+            try:
+                await self.run(scheduled)
+            except Exception as e:
+                logger.error(f"Ошибка задачи {self.name}: {e}", exc_info=True)
+    
+    @abstractmethod
+    async def run(self, scheduled: datetime) -> None:
+        ...
+
+
+class PrefetchScheduler(ScheduledJob):
+    name = "prefetch"
+    
+    def __init__(self, cache: TimetableCache, sessions: SessionStore, schedule: List[int], concurrency: int = 5, rate: float = 10):
+        super().__init__(schedule)
+        self.cache = cache
+        self.sessions = sessions
+        self.concurrency = concurrency
+        self.rate = rate
+    
+    async def run(self, scheduled: datetime) -> None:
+        started = time.monotonic()
+        storage_values = await self.sessions.distinct_storage_values()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate, capacity=self.concurrency)
+        
+        async def prefetch(storage_value: str) -> bool:
+            async with semaphore:
+                await bucket.acquire()
+                entry = await self.cache.refresh(storage_value)
+                return entry.ok
+        
+        results = await asyncio.gather(*(prefetch(value) for value in storage_values), return_exceptions=True)
+        failed = sum(1 for result in results if result is not True)
+        logger.info(
+            f"Прогрев кэша: {len(storage_values)} расписаний, ошибок {failed}, "
+            f"{time.monotonic() - started:.1f} с"
+        )
@@ -0,0 +1,253 @@
+import asyncio
+import html
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+from telegram import Bot, InlineKeyboardMarkup, Message, ReplyKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from bot.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+HTML_TAG = re.compile(r"<[^>]*>")
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+Markup = Union[InlineKeyboardMarkup, ReplyKeyboardMarkup]
+
+
+def visible_length(text: str, parse_mode: Optional[str] = None) -> int:
+    # Telegram ограничивает текст после разбора разметки и считает его в кодовых единицах UTF-16
+    if parse_mode == "HTML":
+        text = html.unescape(HTML_TAG.sub("", text))
+    return len(text.encode("utf-16-le")) // 2
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT, parse_mode: Optional[str] = None) -> List[str]:
+    if visible_length(text, parse_mode) <= limit:
+        return [text]
+    
+    # Режем по абзацам, длинный абзац — по строкам: HTML-теги в расписании не переходят через строку
+    chunks: List[Tuple[str, str]] = []
+    for block in text.split("\n\n"):
+        lines = [block] if visible_length(block, parse_mode) <= limit else _split_lines(block, limit)
+        chunks.extend(("\n" if idx else "\n\n", line) for idx, line in enumerate(lines))
+    
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    for separator, chunk in chunks:
+        length = visible_length(chunk, parse_mode)
+        if current and size + len(separator) + length > limit:
+            parts.append("".join(current))
+            current, size = [], 0
+        if current:
+            current.append(separator)
+            size += len(separator)
+        current.append(chunk)
+        size += length
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _split_lines(block: str, limit: int) -> List[str]:
+    lines: List[str] = []
+    for line in block.split("\n"):
+        lines.extend(line[start:start + limit] for start in range(0, max(len(line), 1), limit))
+    return lines
+
+
+class OutgoingMessage:
+    __slots__ = ("bot", "chat_id", "text", "parse_mode", "reply_markup", "edit_message_id", "priority", "future")
+    
+    def __init__(self, bot: Bot, chat_id: int, text: str, parse_mode: Optional[str] = None,
+                 reply_markup: Optional[Markup] = None, edit_message_id: Optional[int] = None,
+                 priority: int = INTERACTIVE, future: Optional[asyncio.Future] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.reply_markup = reply_markup
+        self.edit_message_id = edit_message_id
+        self.priority = priority
+        self.future = future
+
+
+class OutboundSender:
+    def __init__(self, bot: Optional[Bot] = None, global_rate: float = 30, bulk_rate: float = 25,
+                 chat_rate: float = 1, chat_burst: float = 3, workers: int = 8, bulk_workers: int = 8,
+                 max_retries: int = 3):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = {INTERACTIVE: workers, BULK: bulk_workers}
+        self.max_retries = max_retries
+        self.results: Counter = Counter()
+        self.retry_after = 0
+        # Без запаса на всплески: за любую секунду уходит не больше rate сообщений
+        self._bucket = TokenBucket(global_rate)
+        self._bulk_bucket = TokenBucket(bulk_rate)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, asyncio.Queue] = {priority: asyncio.Queue() for priority in PRIORITY_NAMES}
+        self._interactive_waiting = 0
+        self._resume_at = 0.0
+        self._tasks: List[asyncio.Task] = []
+    
+    @property
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+    
+    def pending_by_priority(self) -> Dict[str, int]:
+        return {name: self._queues[priority].qsize() for priority, name in PRIORITY_NAMES.items()}
+    
+    def start(self) -> None:
+        if self._tasks:
+            return
+        # У ответов пользователям свои обработчики: рассылка не занимает их, даже упираясь в лимит
+        for priority, count in self.workers.items():
+            name = PRIORITY_NAMES[priority]
+            self._tasks.extend(
+                asyncio.create_task(self._worker(self._queues[priority]), name=f"sender-{name}-{idx}")
+                for idx in range(count)
+            )
+    
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._queues.values():
+            while not queue.empty():
+                message = queue.get_nowait()
+                if message.future is not None:
+                    message.future.cancel()
+                queue.task_done()
+    
+    def enqueue(self, chat_id: int, text: str, parse_mode: Optional[str] = None) -> None:
+        self._queues[BULK].put_nowait(OutgoingMessage(self.bot, chat_id, text, parse_mode, priority=BULK))
+    
+    async def send(self, bot: Bot, chat_id: int, text: str, parse_mode: Optional[str] = None,
+                   reply_markup: Optional[Markup] = None, edit_message_id: Optional[int] = None) -> Message:
+        future = asyncio.get_running_loop().create_future()
+        self._queues[INTERACTIVE].put_nowait(
+            OutgoingMessage(bot, chat_id, text, parse_mode, reply_markup, edit_message_id, INTERACTIVE, future)
+        )
+        return await future
+    
+    async def reply(self, message: Message, text: str, parse_mode: Optional[str] = None,
+                    reply_markup: Optional[Markup] = None) -> Message:
+        return await self.send(message.get_bot(), message.chat_id, text, parse_mode, reply_markup)
+    
+    async def edit(self, message: Message, text: str, parse_mode: Optional[str] = None,
+                   reply_markup: Optional[InlineKeyboardMarkup] = None) -> Message:
+        return await self.send(message.get_bot(), message.chat_id, text, parse_mode, reply_markup, message.message_id)
+    
+    async def join(self) -> None:
+        for queue in self._queues.values():
+            await queue.join()
+    
+    async def _wait_turn(self, message: OutgoingMessage) -> None:
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        
+        bucket = self._chat_buckets.get(message.chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[message.chat_id] = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+        await bucket.acquire()
+        
+        if message.priority == INTERACTIVE:
+            self._interactive_waiting += 1
+            try:
+                await self._bucket.acquire()
+            finally:
+                self._interactive_waiting -= 1
+            return
+        
+        await self._bulk_bucket.acquire()
+        # Рассылка не встаёт в очередь к общему лимиту, а берёт свободный токен, только если ответы не ждут
+        while self._interactive_waiting or not self._bucket.try_acquire():
+            await asyncio.sleep(1 / self._bucket.rate)
+    
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            message: OutgoingMessage = await queue.get()
+            try:
+                await self._send(message)
+            finally:
+                queue.task_done()
+                if len(self._chat_buckets) > 10000:
+                    self._chat_buckets = {key: bucket for key, bucket in self._chat_buckets.items() if not bucket.full}
+    
+    async def _send(self, message: OutgoingMessage) -> None:
+        priority = PRIORITY_NAMES[message.priority]
+        editing = message.edit_message_id is not None
+        result: Optional[Message] = None
+        try:
+            parts = split_message(message.text, parse_mode=message.parse_mode)
+            if editing and len(parts) > 1:
+                # Новые части при правке накапливались бы в чате с каждым нажатием — правится только одно сообщение
+                logger.warning(f"Текст для правки сообщения в чате {message.chat_id} не помещается в одно сообщение и обрезан")
+                parts = parts[:1]
+            for idx, part in enumerate(parts):
+                # Клавиатура остаётся у последней части
+                markup = message.reply_markup if idx == len(parts) - 1 else None
+                result = await self._call(message, part, markup, editing)
+        except asyncio.CancelledError:
+            if message.future is not None:
+                message.future.cancel()
+            raise
+        except (Forbidden, BadRequest) as e:
+            self.results[(priority, "failed")] += 1
+            if message.future is not None:
+                if not message.future.done():
+                    message.future.set_exception(e)
+            else:
+                logger.info(f"Сообщение в чат {message.chat_id} не доставлено: {e}")
+            return
+        except Exception as e:
+            # Любая ошибка отправки должна дойти до ожидающего обработчика, а обработчик очереди — остаться в живых
+            self.results[(priority, "failed")] += 1
+            logger.error(f"Не удалось отправить сообщение в чат {message.chat_id}: {e}",
+                         exc_info=not isinstance(e, TelegramError))
+            if message.future is not None and not message.future.done():
+                message.future.set_exception(e)
+            return
+        
+        self.results[(priority, "sent")] += 1
+        if message.future is not None and not message.future.done():
+            message.future.set_result(result)
+    
+    async def _call(self, message: OutgoingMessage, text: str,
+                    reply_markup: Optional[Markup], edit: bool) -> Message:
+        attempts = 0
+        while True:
+            await self._wait_turn(message)
+            attempts += 1
+            try:
+                if edit:
+                    return await message.bot.edit_message_text(
+                        text, chat_id=message.chat_id, message_id=message.edit_message_id,
+                        parse_mode=message.parse_mode, reply_markup=reply_markup,
+                    )
+                return await message.bot.send_message(
+                    message.chat_id, text, parse_mode=message.parse_mode, reply_markup=reply_markup,
+                )
+            except RetryAfter as e:
+                # Ответ 429: Telegram сам говорит, сколько ждать; сообщение не теряется
+                logger.warning(f"Telegram ограничил отправку, пауза {e.retry_after} с")
+                self.retry_after += 1
+                self._resume_at = max(self._resume_at, time.monotonic() + float(e.retry_after))
+            except (Forbidden, BadRequest):
+                raise
+            except TelegramError:
+                if attempts >= self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** attempts)
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, List, Optional
+from bot.storage.session import Session, SessionStore
+
+
+class CachedSessionStore(SessionStore):
+    def __init__(self, backend: SessionStore, max_size: int = 100000, ttl: float = 0):
+        self.backend = backend
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._cached_at: Dict[str, float] = {}
+        self._writes = 0
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._sessions)}
+    
+    async def initialize(self) -> None:
+        await self.backend.initialize()
+    
+    async def close(self) -> None:
+        await self.backend.close()
+    
+    async def get(self, user_id: str) -> Session:
+        session = self._sessions.get(user_id)
+        if session is not None and self.ttl and time.monotonic() - self._cached_at[user_id] > self.ttl:
+            self._drop(user_id)
+            session = None
+        if session is not None:
+            self.hits += 1
+            self._sessions.move_to_end(user_id)
+            return replace(session)
+        
+        self.misses += 1
+        writes = self._writes
+        session = await self.backend.get(user_id)
+        # Пока шло чтение, сессию могли изменить: такой результат не кэшируем
+        if writes == self._writes:
+            self._put(user_id, session)
+        return replace(session)
+    
+    async def update(self, user_id: str, **changes: Optional[str]) -> None:
+        self._check_fields(changes)
+        self._writes += 1
+        try:
+            await self.backend.update(user_id, **changes)
+        except Exception:
+            self._drop(user_id)
+            raise
+        
+        session = self._sessions.get(user_id)
+        if session is not None:
+            for key, value in changes.items():
+                setattr(session, key, value)
+    
+    async def delete(self, user_id: str) -> None:
+        self._writes += 1
+        self._drop(user_id)
+        await self.backend.delete(user_id)
+        self._put(user_id, Session())
+    
+    async def distinct_storage_values(self) -> List[str]:
+        return await self.backend.distinct_storage_values()
+    
+    async def find_users_by_storage_value(self, storage_value: str) -> List[str]:
+        return await self.backend.find_users_by_storage_value(storage_value)
+    
+    async def find_digest_subscribers(self, digest_time: str) -> Dict[str, List[str]]:
+        return await self.backend.find_digest_subscribers(digest_time)
+    
+    def _put(self, user_id: str, session: Session) -> None:
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        self._cached_at[user_id] = time.monotonic()
+        while len(self._sessions) > self.max_size:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._cached_at.pop(evicted, None)
+    
+    def _drop(self, user_id: str) -> None:
+        self._sessions.pop(user_id, None)
+        self._cached_at.pop(user_id, None)
@@ -0,0 +1,51 @@
+import asyncio
+from dataclasses import replace
+from typing import Dict, List, Optional
+from bot.storage.session import Session, SessionStore
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        self._sessions: Dict[str, Session] = {}
+    
+    async def _round_trip(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+    
+    async def get(self, user_id: str) -> Session:
+        self.reads += 1
+        await self._round_trip()
+        session = self._sessions.get(user_id)
+        return replace(session) if session is not None else Session()
+    
+    async def update(self, user_id: str, **changes: Optional[str]) -> None:
+        self._check_fields(changes)
+        self.writes += 1
+        await self._round_trip()
+        session = self._sessions.setdefault(user_id, Session())
+        for key, value in changes.items():
+            setattr(session, key, value)
+    
+    async def delete(self, user_id: str) -> None:
+        self.writes += 1
+        await self._round_trip()
+        self._sessions.pop(user_id, None)
+    
+    async def distinct_storage_values(self) -> List[str]:
+        await self._round_trip()
+        return sorted({session.storage_value for session in self._sessions.values() if session.storage_value})
+    
+    async def find_users_by_storage_value(self, storage_value: str) -> List[str]:
+        await self._round_trip()
+        return [user_id for user_id, session in self._sessions.items() if session.storage_value == storage_value]
+    
+    async def find_digest_subscribers(self, digest_time: str) -> Dict[str, List[str]]:
+        await self._round_trip()
+        subscribers: Dict[str, List[str]] = {}
+        for user_id, session in self._sessions.items():
+            if session.digest_time == digest_time and session.storage_value:
+                subscribers.setdefault(session.storage_value, []).append(user_id)
+        return subscribers
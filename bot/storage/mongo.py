@@ -0,0 +1,200 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from pymongo import AsyncMongoClient, DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError
+from bot.storage.session import Session, SessionStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+DUPLICATE_KEY = 11000
+LEGACY_SUFFIXES = ("login_state", "login_username", "login_university")
+
+
+def legacy_keys(user_id: str) -> List[str]:
+    return [f"{user_id}:{suffix}" for suffix in LEGACY_SUFFIXES]
+
+
+class MongoSessionStore(SessionStore):
+    def __init__(self, uri: str, database: str, collection: str, login_ttl: float = 86400):
+        self.login_ttl = login_ttl
+        try:
+            self.client = AsyncMongoClient(uri)
+            self.collection = self.client[database][collection]
+        except Exception as e:
+            raise ConnectionError(f"Не удалось подключиться к MongoDB: {e}")
+    
+    async def initialize(self) -> None:
+        try:
+            await self.client.admin.command("ping")
+            await self.create_indexes()
+        except Exception as e:
+            raise ConnectionError(f"Не удалось подключиться к MongoDB: {e}")
+    
+    async def create_indexes(self) -> None:
+        # Брошенный вход удаляется целиком: у такой сессии ещё нет расписания
+        await self.collection.create_index("login_expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("storage_value")
+        await self.collection.create_index(
+            [("digest_time", 1), ("storage_value", 1)],
+            partialFilterExpression={"digest_time": {"$exists": True}},
+        )
+    
+    async def close(self) -> None:
+        await self.client.close()
+    
+    async def get(self, user_id: str) -> Session:
+        ids = [user_id, *legacy_keys(user_id)]
+        docs = {doc["_id"]: doc async for doc in self.collection.find({"_id": {"$in": ids}})}
+        main = docs.pop(user_id, None)
+        
+        if main is not None and main.get("v") == SCHEMA_VERSION and not docs:
+            return Session.from_document(main)
+        if main is None and not docs:
+            return Session()
+        
+        session = self._migrate(main, docs)
+        try:
+            await self._apply_migration(self._migration_operations(user_id, main, session, list(docs)))
+        except Exception as e:
+            logger.error(f"Ошибка миграции сессии пользователя {user_id}: {e}")
+        return session
+    
+    async def update(self, user_id: str, **changes: Optional[str]) -> None:
+        self._check_fields(changes)
+        now = datetime.now(timezone.utc)
+        to_set: Dict[str, Any] = {"v": SCHEMA_VERSION, "updated_at": now}
+        to_unset: Dict[str, str] = {"value": ""}
+        for key, value in changes.items():
+            if value is None:
+                to_unset[key] = ""
+            else:
+                to_set[key] = value
+        if "login_state" in changes:
+            if changes["login_state"] is None:
+                to_unset["login_expires_at"] = ""
+            else:
+                to_set["login_expires_at"] = now + timedelta(seconds=self.login_ttl)
+        
+        await self.collection.update_one(
+            {"_id": user_id},
+            {"$set": to_set, "$unset": to_unset, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        )
+    
+    async def delete(self, user_id: str) -> None:
+        await self.collection.delete_many({"_id": {"$in": [user_id, *legacy_keys(user_id)]}})
+    
+    async def distinct_storage_values(self) -> List[str]:
+        values = set(await self.collection.distinct("storage_value"))
+        # Ещё не мигрированные документы старой схемы
+        legacy = await self.collection.distinct("value", {"v": {"$exists": False}, "_id": {"$not": {"$regex": ":"}}})
+        values.update(value for value in legacy if isinstance(value, str) and len(value) > 1)
+        return sorted(value for value in values if value)
+    
+    async def find_users_by_storage_value(self, storage_value: str) -> List[str]:
+        return [doc["_id"] async for doc in self.collection.find({"storage_value": storage_value}, {"_id": 1})]
+    
+    async def find_digest_subscribers(self, digest_time: str) -> Dict[str, List[str]]:
+        subscribers: Dict[str, List[str]] = {}
+        cursor = self.collection.find(
+            {"digest_time": digest_time, "storage_value": {"$exists": True}},
+            {"storage_value": 1},
+        )
+        async for doc in cursor:
+            subscribers.setdefault(doc["storage_value"], []).append(doc["_id"])
+        return subscribers
+    
+    @staticmethod
+    def _migrate(main: Optional[Dict[str, Any]], legacy: Dict[str, Dict[str, Any]]) -> Session:
+        if main is not None and main.get("v") == SCHEMA_VERSION:
+            return Session.from_document(main)
+        
+        session = Session(storage_value=main.get("value") if main else None)
+        for key, doc in legacy.items():
+            setattr(session, key.rsplit(":", 1)[1], doc.get("value"))
+        
+        # В старой схеме во время входа в {user_id} лежал код университета, а не расписание
+        if session.login_state:
+            session.storage_value = None
+        return session
+    
+    def _migration_operations(self, user_id: str, main: Optional[Dict[str, Any]], session: Session,
+                              legacy_ids: List[str]) -> List[Any]:
+        operations: List[Any] = []
+        if main is None or main.get("v") != SCHEMA_VERSION:
+            now = datetime.now(timezone.utc)
+            to_set: Dict[str, Any] = {key: value for key, value in vars(session).items() if value is not None}
+            to_set.update(v=SCHEMA_VERSION, updated_at=now)
+            if session.login_state:
+                to_set["login_expires_at"] = now + timedelta(seconds=self.login_ttl)
+            if main is not None and "created_at" not in main:
+                to_set["created_at"] = now
+            update: Dict[str, Any] = {"$set": to_set, "$unset": {"value": ""}}
+            if main is None:
+                update["$setOnInsert"] = {"created_at": now}
+            # Только документ без версии: если сессию уже записал update(), миграция её не перетирает
+            operations.append(UpdateOne({"_id": user_id, "v": {"$exists": False}}, update, upsert=main is None))
+        if legacy_ids:
+            operations.append(DeleteMany({"_id": {"$in": legacy_ids}}))
+        return operations
+    
+    async def _apply_migration(self, operations: List[Any]) -> None:
+        if not operations:
+            return
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Сессию успели создать новой схемой между чтением и записью — переносить уже нечего
+            errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+    
+    async def compact(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        # Пользователи с документами старой схемы: отдельные ключи {id}:поле или {id} без версии
+        user_ids = set()
+        async for doc in self.collection.find({"_id": {"$regex": ":"}}, {"_id": 1}):
+            user_ids.add(doc["_id"].split(":", 1)[0])
+        async for doc in self.collection.find({"v": {"$exists": False}, "_id": {"$not": {"$regex": ":"}}}, {"_id": 1}):
+            user_ids.add(doc["_id"])
+        
+        result = {"users": len(user_ids), "removed": 0, "migrated": 0}
+        pending = sorted(user_ids)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            ids = [key for user_id in batch for key in (user_id, *legacy_keys(user_id))]
+            docs = {doc["_id"]: doc async for doc in self.collection.find({"_id": {"$in": ids}})}
+            
+            operations: List[Any] = []
+            for user_id in batch:
+                main = docs.get(user_id)
+                legacy = {key: docs[key] for key in legacy_keys(user_id) if key in docs}
+                result["removed"] += len(legacy)
+                if main is None or main.get("v") != SCHEMA_VERSION:
+                    result["migrated"] += 1
+                operations.extend(self._migration_operations(user_id, main, self._migrate(main, legacy), list(legacy)))
+            if not dry_run:
+                await self._apply_migration(operations)
+        return result
+    
+    async def stats(self) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        storage = {}
+        async for doc in await self.collection.aggregate([{"$collStats": {"storageStats": {}}}]):
+            storage = doc.get("storageStats", {})
+        return {
+            "documents": await self.collection.estimated_document_count(),
+            "users": await self.collection.count_documents({"storage_value": {"$exists": True}}),
+            "digest_subscribers": await self.collection.count_documents({"digest_time": {"$exists": True}}),
+            "logins_in_progress": await self.collection.count_documents({"login_state": {"$exists": True}}),
+            "logins_expired": await self.collection.count_documents({"login_expires_at": {"$lt": now}}),
+            "legacy_documents": await self.collection.count_documents({"$or": [
+                {"_id": {"$regex": ":"}},
+                {"v": {"$exists": False}},
+            ]}),
+            "data_size": storage.get("size", 0),
+            "storage_size": storage.get("storageSize", 0),
+            "index_size": storage.get("totalIndexSize", 0),
+            "indexes": sorted(storage.get("indexSizes", {})),
+        }
@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Session:
+    storage_value: Optional[str] = None
+    login_state: Optional[str] = None
+    login_username: Optional[str] = None
+    login_university: Optional[str] = None
+    login_deadline: Optional[str] = None
+    digest_time: Optional[str] = None
+    
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "Session":
+        return cls(**{field.name: doc.get(field.name) for field in fields(cls)})
+
+
+SESSION_FIELDS = frozenset(field.name for field in fields(Session))
+
+
+class SessionStore(ABC):
+    async def initialize(self) -> None:
+        pass
+    
+    async def close(self) -> None:
+        pass
+    
+    @abstractmethod
+    async def get(self, user_id: str) -> Session:
+        ...
+    
+    @abstractmethod
+    async def update(self, user_id: str, **changes: Optional[str]) -> None:
+        ...
+    
+    @abstractmethod
+    async def delete(self, user_id: str) -> None:
+        ...
+    
+    @abstractmethod
+    async def distinct_storage_values(self) -> List[str]:
+        ...
+    
+    @abstractmethod
+    async def find_users_by_storage_value(self, storage_value: str) -> List[str]:
+        ...
+    
+    @abstractmethod
+    async def find_digest_subscribers(self, digest_time: str) -> Dict[str, List[str]]:
+        ...
+    
+    @staticmethod
+    def _check_fields(changes: Dict[str, Any]) -> None:
+        unknown = set(changes) - SESSION_FIELDS
+        if unknown:
+            raise ValueError(f"Неизвестные поля сессии: {', '.join(sorted(unknown))}")
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from pymongo import AsyncMongoClient
+
+
+class SharedCache(ABC):
+    async def initialize(self) -> None:
+        pass
+    
+    async def close(self) -> None:
+        pass
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+    
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+    
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class MemorySharedCache(SharedCache):
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+    
+    async def _round_trip(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        await self._round_trip()
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.time():
+            del self._values[key]
+            return None
+        return value
+    
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._round_trip()
+        self._values[key] = (value, time.time() + ttl)
+    
+    async def delete(self, key: str) -> None:
+        await self._round_trip()
+        self._values.pop(key, None)
+
+
+class MongoSharedCache(SharedCache):
+    def __init__(self, uri: str, database: str, collection: str):
+        try:
+            self.client = AsyncMongoClient(uri)
+            self.collection = self.client[database][collection]
+        except Exception as e:
+            raise ConnectionError(f"Не удалось подключиться к MongoDB: {e}")
+    
+    async def initialize(self) -> None:
+        try:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            raise ConnectionError(f"Не удалось подключиться к MongoDB: {e}")
+    
+    async def close(self) -> None:
+        await self.client.close()
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        # TTL-индекс удаляет записи с задержкой до минуты, поэтому срок проверяется и при чтении
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        return bytes(doc["value"]) if doc is not None else None
+    
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": expires_at}},
+            upsert=True,
+        )
+    
+    async def delete(self, key: str) -> None:
+        await self.collection.delete_one({"_id": key})
@@ -1,7 +1,16 @@
 import re
+from typing import Optional
 
 EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+TIME_PATTERN = re.compile(r'^([01]?\d|2[0-3])[:.]([0-5]\d)$')
 
 
 def validate_email(email: str) -> bool:
     return bool(EMAIL_PATTERN.match(email))
+
+
+def normalize_time(value: str) -> Optional[str]:
+    match = TIME_PATTERN.match(value.strip())
+    if not match:
+        return None
+    return f"{int(match.group(1)):02d}:{match.group(2)}"
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from bot.api.cache import TimetableCache
+from bot.api.models import WeekTimetable, diff_weeks
+from bot.constants import get_current_date, get_week_start, shift_date
+from bot.ratelimit import TokenBucket
+from bot.render import format_changes
+from bot.scheduler import ScheduledJob
+from bot.sender import OutboundSender
+from bot.storage.session import SessionStore
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(NamedTuple):
+    payload_hash: str
+    week: WeekTimetable
+
+
+class ChangeWatcher(ScheduledJob):
+    name = "watcher"
+    
+    def __init__(self, cache: TimetableCache, sessions: SessionStore, sender: OutboundSender, schedule: List[int],
+                 concurrency: int = 5, rate: float = 10):
+        super().__init__(schedule)
+        self.cache = cache
+        self.sessions = sessions
+        self.sender = sender
+        self.concurrency = concurrency
+        self.rate = rate
+        self.snapshots: Dict[Tuple[str, str], Snapshot] = {}
+    
+    async def run(self, scheduled: datetime) -> None:
+        started = time.monotonic()
+        today = get_current_date()
+        # Те же недели вперёд, что доступны в навигации: пара в понедельник меняется и в выходные
+        week_starts = [get_week_start(shift_date(today, offset * 7)) for offset in range(self.cache.window_weeks + 1)]
+        storage_values = await self.sessions.distinct_storage_values()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate, capacity=self.concurrency)
+        
+        async def check_week(storage_value: str, week_start: str) -> Optional[Tuple[Snapshot, Snapshot]]:
+            async with semaphore:
+                await bucket.acquire()
+                entry = await self.cache.refresh(storage_value, week_start)
+            if not entry.ok:
+                return None
+            
+            key = (storage_value, week_start)
+            previous = self.snapshots.get(key)
+            current = self.snapshots[key] = Snapshot(entry.payload_hash, entry.week)
+            # Неделя без прежнего снимка (только что вошла в окно) не сравнивается: все её пары оказались бы новыми
+            return (previous, current) if previous is not None else None
+        
+        async def check(storage_value: str) -> int:
+            weeks = [pair for pair in await asyncio.gather(
+                *(check_week(storage_value, week_start) for week_start in week_starts)
+            ) if pair is not None]
+            if all(previous.payload_hash == current.payload_hash for previous, current in weeks):
+                return 0
+            
+            # Всё окно сравнивается разом, чтобы пара, перенесённая на другую неделю, считалась переносом
+            diff = diff_weeks(
+                WeekTimetable([lesson for previous, _ in weeks for lesson in previous.week.lessons], {}),
+                WeekTimetable([lesson for _, current in weeks for lesson in current.week.lessons], {}),
+                since_date=today,
+            )
+            if not diff:
+                return 0
+            
+            text = format_changes(diff, storage_value.endswith('T'))
+            user_ids = await self.sessions.find_users_by_storage_value(storage_value)
+            for user_id in user_ids:
+                self.sender.enqueue(int(user_id), text, "HTML")
+            return len(user_ids)
+        
+        results = await asyncio.gather(*(check(value) for value in storage_values), return_exceptions=True)
+        active = set(storage_values)
+        current_week = week_starts[0]
+        for key in list(self.snapshots):
+            storage_value, week_start = key
+            if storage_value not in active or week_start < current_week:
+                del self.snapshots[key]
+        
+        changed = sum(1 for result in results if isinstance(result, int) and result)
+        notified = sum(result for result in results if isinstance(result, int))
+        failed = sum(1 for result in results if isinstance(result, BaseException))
+        logger.info(
+            f"Проверка изменений: {len(storage_values)} расписаний, изменилось {changed}, "
+            f"уведомлений {notified}, ошибок {failed}, {time.monotonic() - started:.1f} с"
+        )
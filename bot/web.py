@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "_receive")
+    
+    def __init__(self, scope: dict, receive: Callable):
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query: Dict[str, str] = {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers: Dict[str, str] = {key.decode().lower(): value.decode() for key, value in scope.get("headers", [])}
+        self._receive = receive
+    
+    async def body(self) -> bytes:
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+
+class Response:
+    def __init__(self, body: bytes = b"", status: int = 200, headers: Optional[Dict[str, str]] = None,
+                 content_type: str = "text/plain; charset=utf-8"):
+        self.body = body
+        self.status = status
+        self.headers = {"content-type": content_type, **(headers or {})}
+    
+    async def send(self, send: Callable) -> None:
+        headers = [(key.encode(), value.encode()) for key, value in self.headers.items()]
+        headers.append((b"content-length", str(len(self.body)).encode()))
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class StreamingResponse(Response):
+    def __init__(self, chunks: AsyncIterator[bytes], status: int = 200, headers: Optional[Dict[str, str]] = None,
+                 content_type: str = "text/plain; charset=utf-8"):
+        super().__init__(b"", status, headers, content_type)
+        self.chunks = chunks
+    
+    async def send(self, send: Callable) -> None:
+        # Без content-length uvicorn отдаёт тело частями (chunked), не собирая его целиком
+        headers = [(key.encode(), value.encode()) for key, value in self.headers.items()]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        async for chunk in self.chunks:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class WebApp:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._prefix_routes: List[Tuple[str, str, Handler]] = []
+        self.add_route("GET", "/healthz", self._health)
+    
+    def add_route(self, method: str, path: str, handler: Handler) -> None:
+        self._routes[(method, path)] = handler
+    
+    def add_prefix_route(self, method: str, prefix: str, handler: Handler) -> None:
+        self._prefix_routes.append((method, prefix, handler))
+    
+    def _resolve(self, request: Request) -> Optional[Handler]:
+        handler = self._routes.get((request.method, request.path))
+        if handler is not None:
+            return handler
+        for method, prefix, handler in self._prefix_routes:
+            if request.method == method and request.path.startswith(prefix):
+                return handler
+        return None
+    
+    async def _health(self, request: Request) -> Response:
+        return Response(b"ok")
+    
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            return
+        
+        request = Request(scope, receive)
+        handler = self._resolve(request)
+        if handler is None:
+            await Response(b"not found", status=404).send(send)
+            return
+        
+        try:
+            response = await handler(request)
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса {request.method} {request.path}: {e}", exc_info=True)
+            response = Response(b"internal error", status=500)
+        await response.send(send)
+
+
+class WebServer:
+    def __init__(self, app: WebApp, host: str, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, lifespan="off", log_level="warning"))
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self.server.serve(), name="web")
+        while not self.server.started:
+            if self._task.done():
+                await self._task
+                raise RuntimeError("HTTP-сервер не запустился")
+            await asyncio.sleep(0.05)
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self.server.should_exit = True
+            await self._task
+            self._task = None
@@ -2,10 +2,11 @@
 import asyncio
 import logging
 from bot.bot import TelegramBot
+from bot.cluster import ClusterFront
 from bot.config import Config
 
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 
@@ -18,8 +19,11 @@ logger = logging.getLogger(__name__)
 async def main():
     try:
         config = Config()
-        bot = TelegramBot(config)
-        await bot.start()
+        if config.workers > 1:
+            await ClusterFront(config).start()
+        else:
+            bot = TelegramBot(config)
+            await bot.start()
     except ValueError as e:
         logger.error(f"Ошибка конфигурации: {e}")
     except Exception as e: